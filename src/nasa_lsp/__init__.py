@@ -1,4 +1,4 @@
-from nasa_lsp.analyzer import Diagnostic, Position, Range, analyze
+from nasa_lsp.analyzer import Diagnostic, DiagnosticArray, Position, Range, analyze, analyze_path
 from nasa_lsp.server import serve
 
-__all__ = ["Diagnostic", "Position", "Range", "analyze", "serve"]
+__all__ = ["Diagnostic", "DiagnosticArray", "Position", "Range", "analyze", "analyze_path", "serve"]
@@ -1,33 +1,172 @@
 from __future__ import annotations
 
 import ast
+import io
+import re
+import sys
+import tokenize
+from array import array
 from dataclasses import dataclass
-from typing import Final, override
+from functools import cached_property
+from importlib.util import decode_source
+from typing import TYPE_CHECKING, Final, cast, get_args
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterator
+    from pathlib import Path
 
 MAX_FUNCTION_LINES: Final = 60
 MIN_ASSERTS_PER_FUNCTION: Final = 2
-
-
-@dataclass
+# Start line, start character, end line, end character
+POSITION_COLUMNS: Final = 4
+FORBIDDEN_APIS: Final = frozenset(
+    map(sys.intern, ("eval", "exec", "compile", "globals", "locals", "__import__", "setattr", "getattr"))
+)
+# Rule codes are shared by every diagnostic, interned so comparisons short-circuit on identity
+CODE_FORBIDDEN_API: Final = sys.intern("NASA01-A")
+CODE_RECURSION: Final = sys.intern("NASA01-B")
+CODE_UNBOUNDED_LOOP: Final = sys.intern("NASA02")
+CODE_FUNCTION_LENGTH: Final = sys.intern("NASA04")
+CODE_ASSERT_DENSITY: Final = sys.intern("NASA05")
+# Matched with re.match, whose internal cache keeps it compiled; re.compile itself is NASA01-A
+DEF_PREFIX_PATTERN: Final = r"(?:async\s+)?def\s+"
+# Signature such as "Call(expr func, expr* args, keyword* keywords)" that node classes carry as their docstring
+ASDL_SIGNATURE_PATTERN: Final = r"\w+\((.*)\)$"
+# Every rule needs one of these words in the source, so files without any are never parsed
+TRIGGER_WORDS: Final = ("def", "while", *sorted(FORBIDDEN_APIS))
+TRIGGER_TOKENS: Final = tuple(word.encode() for word in TRIGGER_WORDS)
+# Raw bytes only spell the source's words in these encodings; any other coding cookie needs a parse
+PREFILTER_ENCODINGS: Final = frozenset({"utf-8", "utf-8-sig"})
+FUNCTION_DEFS: Final = (ast.FunctionDef, ast.AsyncFunctionDef)
+# Nodes of these kinds only ever hold names and flags, never expressions or statements
+TERMINAL_NODE_BASES: Final = (
+    ast.expr_context,
+    ast.boolop,
+    ast.operator,
+    ast.unaryop,
+    ast.cmpop,
+    ast.alias,
+    ast.type_ignore,
+)
+
+
+def _annotation_holds_nodes(annotation: object) -> bool:
+    assert annotation is not None
+    assert not isinstance(annotation, ast.AST)
+    pending = [annotation]
+    while pending:
+        current = pending.pop()
+        args = get_args(current)
+        if args:
+            pending.extend(args)
+        elif (
+            isinstance(current, type) and issubclass(current, ast.AST) and not issubclass(current, TERMINAL_NODE_BASES)
+        ):
+            return True
+    return False
+
+
+def _field_types(cls: type[ast.AST]) -> dict[str, object] | None:
+    assert issubclass(cls, ast.AST)
+    assert cls is not ast.AST
+    field_types = cast("dict[str, object] | None", vars(cls).get("_field_types"))
+    if field_types is not None:
+        return field_types
+    # _field_types only exists from 3.13; before that the ASDL signature in the docstring names each field's type
+    match = re.match(ASDL_SIGNATURE_PATTERN, cls.__doc__ or "")
+    if match is None:
+        return None
+    fields = (field.partition(" ") for field in match.group(1).split(", "))
+    return {name: vars(ast).get(type_name.rstrip("*?"), object) for type_name, _, name in fields}
+
+
+def _is_leaf_node_type(cls: type[ast.AST]) -> bool:
+    assert issubclass(cls, ast.AST)
+    assert cls is not ast.AST
+    # Without any type information (docstrings stripped by -OO), only field-less nodes count as leaves
+    field_types = _field_types(cls)
+    if field_types is None:
+        return not cls._fields
+    return not any(_annotation_holds_nodes(annotation) for annotation in field_types.values())
+
+
+# Children of these nodes are never checked, so the walks do not expand them
+LEAF_NODE_TYPES: Final = frozenset(
+    cls
+    for cls in cast("list[object]", list(vars(ast).values()))
+    if isinstance(cls, type) and issubclass(cls, ast.AST) and cls is not ast.AST and _is_leaf_node_type(cls)
+)
+
+
+def _signature_nodes(node: ast.FunctionDef | ast.AsyncFunctionDef) -> list[ast.AST]:
+    assert node
+    assert node.args
+    # Everything a def holds besides its body belongs to the enclosing scope
+    children: list[ast.AST] = [*node.decorator_list, node.args, *node.type_params]
+    if node.returns is not None:
+        children.append(node.returns)
+    return children
+
+
+@dataclass(slots=True, frozen=True)
 class Position:
     line: int
     character: int
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Range:
     start: Position
     end: Position
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Diagnostic:
     range: Range
     message: str
     code: str
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
+class DiagnosticArray:
+    # Columns instead of a four-object graph per diagnostic; pickles as a few flat buffers
+    positions: array[int]
+    messages: list[str]
+    codes: list[str]
+
+    @classmethod
+    def from_diagnostics(cls, diagnostics: list[Diagnostic]) -> DiagnosticArray:
+        assert cls
+        assert isinstance(diagnostics, list)
+        positions: array[int] = array("i")
+        for d in diagnostics:
+            positions.extend((d.range.start.line, d.range.start.character, d.range.end.line, d.range.end.character))
+        return cls(positions, [d.message for d in diagnostics], [d.code for d in diagnostics])
+
+    def __len__(self) -> int:
+        assert len(self.positions) == POSITION_COLUMNS * len(self.codes)
+        assert len(self.messages) == len(self.codes)
+        return len(self.codes)
+
+    def __iter__(self) -> Iterator[Diagnostic]:
+        assert len(self.positions) == POSITION_COLUMNS * len(self.codes)
+        assert len(self.messages) == len(self.codes)
+        cols = self.positions
+        for i, (message, code) in enumerate(zip(self.messages, self.codes, strict=True)):
+            base = i * POSITION_COLUMNS
+            start = Position(line=cols[base], character=cols[base + 1])
+            end = Position(line=cols[base + 2], character=cols[base + 3])
+            yield Diagnostic(range=Range(start=start, end=end), message=message, code=sys.intern(code))
+
+
+@dataclass(slots=True)
+class FunctionScope:
+    node: ast.FunctionDef | ast.AsyncFunctionDef
+    assert_count: int = 0
+    calls_self: bool = False
+
+
+@dataclass(slots=True, frozen=True)
 class FunctionStat:
     name: str
     line_start: int
@@ -35,14 +174,59 @@ class FunctionStat:
     assert_count: int
 
 
-class NasaVisitor(ast.NodeVisitor):
-    def __init__(self, text: str) -> None:
-        assert text
-        assert isinstance(text, str)
-        self.text: str = text
-        self.lines: list[str] = text.splitlines()
+class NasaVisitor:
+    def __init__(self, source: str | bytes) -> None:
+        assert source
+        assert isinstance(source, str | bytes)
+        self.source: str | bytes = source
         self.diagnostics: list[Diagnostic] = []
         self.stats: list[FunctionStat] = []
+        self._name_ranges: dict[int, Range] = {}
+        self._node_checks: dict[type[ast.AST], Callable[[ast.AST], None]] = {
+            ast.Call: self._check_call,
+            ast.While: self._check_while,
+        }
+
+    @cached_property
+    def lines(self) -> list[str]:
+        # Decoding and splitting are deferred until a diagnostic needs line text
+        assert self.source
+        assert self.diagnostics is not None
+        text = self.source if isinstance(self.source, str) else decode_source(self.source)
+        return text.splitlines()
+
+    def run(self, tree: ast.AST) -> None:
+        assert tree
+        assert not self.diagnostics
+        # One walk checks every node; each node carries the function whose body owns its asserts and calls
+        scopes: list[FunctionScope] = []
+        stack: list[tuple[ast.AST, FunctionScope | None]] = [(tree, None)]
+        while stack:
+            node, scope = stack.pop()
+            node_type = type(node)
+            check = self._node_checks.get(node_type)
+            if check is not None:
+                check(node)
+            if scope is not None:
+                if node_type is ast.Assert:
+                    scope.assert_count += 1
+                elif isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == scope.node.name:
+                    scope.calls_self = True
+            if node_type in LEAF_NODE_TYPES:
+                continue
+            if isinstance(node, FUNCTION_DEFS):
+                inner = FunctionScope(node)
+                scopes.append(inner)
+                stack.extend((child, inner) for child in node.body)
+                stack.extend((child, None) for child in _signature_nodes(node))
+            else:
+                # Class bodies are not part of any function, though methods inside open their own scope
+                owner = None if node_type is ast.ClassDef else scope
+                stack.extend((child, owner) for child in ast.iter_child_nodes(node))
+
+        for scope in sorted(scopes, key=lambda sc: (sc.node.lineno, sc.node.col_offset)):
+            self._check_function(scope)
+        self.diagnostics.sort(key=lambda d: (d.range.start.line, d.range.start.character))
 
     @staticmethod
     def _pos(lineno: int, col: int) -> Position:
@@ -60,6 +244,14 @@ class NasaVisitor(ast.NodeVisitor):
         )
 
     def _range_for_func_name(self, node: ast.FunctionDef | ast.AsyncFunctionDef) -> Range:
+        assert node
+        assert self._name_ranges is not None
+        rng = self._name_ranges.get(id(node))
+        if rng is None:
+            rng = self._name_ranges[id(node)] = self._compute_range_for_func_name(node)
+        return rng
+
+    def _compute_range_for_func_name(self, node: ast.FunctionDef | ast.AsyncFunctionDef) -> Range:
         assert node
         assert node.end_lineno is not None
         lineno = node.lineno
@@ -68,19 +260,14 @@ class NasaVisitor(ast.NodeVisitor):
         if not (0 <= lineno - 1 < len(self.lines)):
             return self._range_for_node(node)
 
-        line_text = self.lines[lineno - 1]
-        def_kw = "async def" if isinstance(node, ast.AsyncFunctionDef) else "def"
-        idx = line_text.find(def_kw, col)
-        if idx == -1:
+        match = re.match(DEF_PREFIX_PATTERN, self.lines[lineno - 1][col:])
+        if match is None:
             return Range(
                 start=self._pos(lineno, col),
                 end=self._pos(lineno, col + len(node.name)),
             )
 
-        name_start = idx + len(def_kw)
-        while name_start < len(line_text) and line_text[name_start].isspace():
-            name_start += 1
-
+        name_start = col + match.end()
         return Range(
             start=self._pos(lineno, name_start),
             end=self._pos(lineno, name_start + len(node.name)),
@@ -92,94 +279,60 @@ class NasaVisitor(ast.NodeVisitor):
         assert code
         self.diagnostics.append(Diagnostic(range=rng, message=message, code=code))
 
-    @override
-    def visit_Call(self, node: ast.Call) -> None:
-        assert node
-        assert hasattr(node, "func")
-        name: str | None = None
-        target_node: ast.expr | None = None
-
-        if isinstance(node.func, ast.Name):
-            name = node.func.id
-            target_node = node.func
-        elif isinstance(node.func, ast.Attribute):
-            name = node.func.attr
-            target_node = node.func
-
-        if name and target_node:
-            forbidden = {"eval", "exec", "compile", "globals", "locals", "__import__", "setattr", "getattr"}
-            if name in forbidden:
-                self._add_diag(
-                    self._range_for_node(target_node),
-                    f"Call to forbidden API '{name}' (NASA01: restricted subset)",
-                    "NASA01-A",
-                )
-
-        self.generic_visit(node)
-
-    @override
-    def visit_While(self, node: ast.While) -> None:
-        assert node
-        assert hasattr(node, "test")
-        if isinstance(node.test, ast.Constant) and node.test.value is True:
+    def _check_call(self, node: ast.AST) -> None:
+        # Runs for every call in the tree, so the invariants checked here are plain attribute loads
+        assert isinstance(node, ast.Call)
+        func = node.func
+        assert func
+        if isinstance(func, ast.Name):
+            name = func.id
+        elif isinstance(func, ast.Attribute):
+            name = func.attr
+        else:
+            return
+
+        if name in FORBIDDEN_APIS:
+            self._add_diag(
+                self._range_for_node(func),
+                f"Call to forbidden API '{name}' (NASA01: restricted subset)",
+                CODE_FORBIDDEN_API,
+            )
+
+    def _check_while(self, node: ast.AST) -> None:
+        assert isinstance(node, ast.While)
+        test = node.test
+        assert test
+        if isinstance(test, ast.Constant) and test.value is True:
             self._add_diag(
                 self._range_for_node(node),
                 "Unbounded loop 'while True' (NASA02: loops must be bounded)",
-                "NASA02",
+                CODE_UNBOUNDED_LOOP,
             )
-        self.generic_visit(node)
-
-    def _check_recursion(self, node: ast.FunctionDef | ast.AsyncFunctionDef) -> bool:
-        func_name = node.name
-        assert func_name
-        assert node.body
-        for stmt in node.body:
-            if isinstance(stmt, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
-                continue
-            for sub_node in ast.walk(stmt):
-                if (
-                    isinstance(sub_node, ast.Call)
-                    and isinstance(sub_node.func, ast.Name)
-                    and sub_node.func.id == func_name
-                ):
-                    return True
-        return False
-
-    def _count_asserts(self, node: ast.FunctionDef | ast.AsyncFunctionDef) -> int:
-        assert node
-        assert node.body is not None
-        assert_count = 0
-        for stmt in node.body:
-            if isinstance(stmt, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
-                continue
-            for sub_node in ast.walk(stmt):
-                if isinstance(sub_node, ast.Assert):
-                    assert_count += 1
-        return assert_count
 
-    def _check_function(self, node: ast.FunctionDef | ast.AsyncFunctionDef) -> None:
+    def _check_function(self, scope: FunctionScope) -> None:
+        node = scope.node
         func_name = node.name
         assert func_name
         assert node.end_lineno is not None
+        calls_self, assert_count = scope.calls_self, scope.assert_count
         func_name_range = self._range_for_func_name(node)
 
         # Statistics
         line_count = node.end_lineno - node.lineno + 1
-        assert_count = self._count_asserts(node)
         self.stats.append(FunctionStat(func_name, node.lineno, line_count, assert_count))
 
-        if self._check_recursion(node):
+        if calls_self:
             self._add_diag(
                 func_name_range,
                 f"Recursive call to '{func_name}' (NASA01: no recursion)",
-                "NASA01-B",
+                CODE_RECURSION,
             )
 
         if line_count >= MAX_FUNCTION_LINES:
             self._add_diag(
                 func_name_range,
                 f"Function '{func_name}' longer than {MAX_FUNCTION_LINES} lines (NASA04)",
-                "NASA04",
+                CODE_FUNCTION_LENGTH,
             )
 
         if assert_count < MIN_ASSERTS_PER_FUNCTION:
@@ -189,33 +342,66 @@ class NasaVisitor(ast.NodeVisitor):
                     f"Function '{func_name}' has only {assert_count} assert(s); "
                     f"expected at least {MIN_ASSERTS_PER_FUNCTION} (NASA05)"
                 ),
-                "NASA05",
+                CODE_ASSERT_DENSITY,
             )
 
-    @override
-    def visit_FunctionDef(self, node: ast.FunctionDef) -> None:
-        assert node
-        assert hasattr(node, "name")
-        self._check_function(node)
-        self.generic_visit(node)
 
-    @override
-    def visit_AsyncFunctionDef(self, node: ast.AsyncFunctionDef) -> None:
-        assert node
-        assert hasattr(node, "name")
-        self._check_function(node)
-        self.generic_visit(node)
+def _analyze_source(source: str | bytes) -> tuple[list[Diagnostic], list[FunctionStat]]:
+    assert source
+    assert isinstance(source, str | bytes)
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return [], []
+    visitor = NasaVisitor(source)
+    visitor.run(tree)
+    return visitor.diagnostics, visitor.stats
 
 
 def analyze(text: str) -> tuple[list[Diagnostic], list[FunctionStat]]:
     assert isinstance(text, str)
     assert text is not None
-    if not text.strip():
+    if not text.strip() or not may_trigger(text):
         return [], []
+    return _analyze_source(text)
+
+
+def may_trigger(source: str | bytes) -> bool:
+    assert source
+    assert TRIGGER_TOKENS
+    # Non-ASCII identifiers are NFKC-normalized by the parser and can spell a trigger differently
+    if not source.isascii():
+        return True
+    # Text is scanned as it is, so callers never encode a buffer just to prefilter it
+    if isinstance(source, str):
+        return any(word in source for word in TRIGGER_WORDS)
+    return any(token in source for token in TRIGGER_TOKENS)
+
+
+def _declared_encoding(source: bytes) -> str | None:
+    assert source
+    assert PREFILTER_ENCODINGS
     try:
-        tree = ast.parse(text)
+        encoding, _ = tokenize.detect_encoding(io.BytesIO(source).readline)
     except SyntaxError:
+        return None
+    return encoding
+
+
+def analyze_bytes(source: bytes) -> tuple[list[Diagnostic], list[FunctionStat]]:
+    # Parsing raw bytes lets the tokenizer handle the BOM and coding cookie itself
+    assert isinstance(source, bytes)
+    assert TRIGGER_TOKENS
+    # The parser rejects NUL bytes anyway, so binary files are dropped before any work
+    if not source.strip() or b"\0" in source:
         return [], []
-    visitor = NasaVisitor(text)
-    visitor.visit(tree)
-    return visitor.diagnostics, visitor.stats
+    # A coding cookie such as utf-7 can spell eval in bytes that never contain it
+    if not may_trigger(source) and _declared_encoding(source) in PREFILTER_ENCODINGS:
+        return [], []
+    return _analyze_source(source)
+
+
+def analyze_path(path: Path) -> tuple[list[Diagnostic], list[FunctionStat]]:
+    assert path
+    assert path.suffix
+    return analyze_bytes(path.read_bytes())
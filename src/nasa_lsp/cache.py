@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Final, cast
+
+from nasa_lsp import analyzer
+from nasa_lsp.analyzer import Diagnostic, Position, Range
+
+# Bump whenever the cache layout changes; rule changes are covered by ANALYZER_VERSION
+CACHE_VERSION: Final = 2
+ROW_FIELDS: Final = 6
+ENTRY_FIELDS: Final = 4
+
+type CacheKey = tuple[str, int, int, str]
+type CacheRow = list[int | str]
+
+
+def _analyzer_digest() -> str:
+    assert analyzer.__file__
+    assert CACHE_VERSION
+    # Keyed on the rules themselves, so editing them in a checkout invalidates old results too
+    return hashlib.sha256(Path(analyzer.__file__).read_bytes()).hexdigest()
+
+
+ANALYZER_VERSION: Final = _analyzer_digest()
+
+
+def source_digest(source: bytes) -> str:
+    assert isinstance(source, bytes)
+    assert CACHE_VERSION
+    return hashlib.sha256(source).hexdigest()
+
+
+def content_digest(file: Path) -> str:
+    assert file
+    assert isinstance(file, Path)
+    return source_digest(file.read_bytes())
+
+
+def default_cache_path(project: Path) -> Path:
+    assert project
+    assert os.environ is not None
+    base = os.environ.get("XDG_CACHE_HOME") or str(Path.home() / ".cache")
+    # One file per project, so a run only loads and rewrites the entries of the tree it lints
+    name = hashlib.sha256(str(project.absolute()).encode()).hexdigest()[:16]
+    return Path(base) / "nasa_lsp" / f"lint-{name}.json"
+
+
+def _encode(diag: Diagnostic) -> CacheRow:
+    assert diag
+    assert diag.range
+    start, end = diag.range.start, diag.range.end
+    return [start.line, start.character, end.line, end.character, diag.message, diag.code]
+
+
+def _decode(row: CacheRow) -> Diagnostic:
+    assert row
+    assert len(row) == ROW_FIELDS
+    start = Position(line=cast("int", row[0]), character=cast("int", row[1]))
+    end = Position(line=cast("int", row[2]), character=cast("int", row[3]))
+    return Diagnostic(
+        range=Range(start=start, end=end), message=cast("str", row[4]), code=sys.intern(cast("str", row[5]))
+    )
+
+
+def _load_entries(path: Path) -> dict[str, list[object]]:
+    assert path
+    assert isinstance(path, Path)
+    try:
+        raw = cast("object", json.loads(path.read_text()))
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(raw, dict):
+        return {}
+    data = cast("dict[str, object]", raw)
+    entries = data.get("entries")
+    stale = data.get("version") != CACHE_VERSION or data.get("analyzer") != ANALYZER_VERSION
+    if stale or not isinstance(entries, dict):
+        return {}
+    return cast("dict[str, list[object]]", entries)
+
+
+class LintCache:
+    def __init__(self, path: Path) -> None:
+        assert path
+        assert isinstance(path, Path)
+        self.path: Path = path
+        self.entries: dict[str, list[object]] = _load_entries(path)
+        self.dirty: bool = False
+        self.seen: set[str] = set()
+
+    def get(self, file: Path) -> tuple[CacheKey, list[Diagnostic] | None]:
+        assert file
+        assert isinstance(file, Path)
+        st = file.stat()
+        path = str(file.absolute())
+        self.seen.add(path)
+        entry = self.entries.get(path)
+        if entry is None:
+            # Nothing to compare a digest against; the analysis reads the file and supplies it for put()
+            return (path, st.st_mtime_ns, st.st_size, ""), None
+        if entry[0] == st.st_mtime_ns and entry[1] == st.st_size:
+            return (path, st.st_mtime_ns, st.st_size, cast("str", entry[2])), self._rows(entry)
+        # A changed stat may still be the same content (checkout, touch), so fall back to the digest
+        key = (path, st.st_mtime_ns, st.st_size, content_digest(file))
+        if entry[2] != key[3]:
+            return key, None
+        self.entries[path] = [key[1], key[2], key[3], entry[3]]
+        self.dirty = True
+        return key, self._rows(entry)
+
+    @staticmethod
+    def _rows(entry: list[object]) -> list[Diagnostic]:
+        assert entry
+        assert len(entry) == ENTRY_FIELDS
+        return [_decode(row) for row in cast("list[CacheRow]", entry[3])]
+
+    def put(self, key: CacheKey, diagnostics: list[Diagnostic]) -> None:
+        assert key[0]
+        assert key[3]
+        self.entries[key[0]] = [key[1], key[2], key[3], [_encode(d) for d in diagnostics]]
+        self.dirty = True
+
+    def prune(self, roots: list[Path]) -> None:
+        assert roots
+        assert isinstance(self.seen, set)
+        # Files under a linted root that this run did not see were deleted, renamed or excluded
+        prefixes = tuple(str(root.absolute()).rstrip(os.sep) + os.sep for root in roots)
+        stale = [path for path in self.entries if path not in self.seen and path.startswith(prefixes)]
+        for path in stale:
+            del self.entries[path]
+        self.dirty = self.dirty or bool(stale)
+
+    def save(self) -> None:
+        assert self.path
+        assert isinstance(self.entries, dict)
+        if not self.dirty:
+            return
+        payload = {"version": CACHE_VERSION, "analyzer": ANALYZER_VERSION, "entries": self.entries}
+        tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with tmp.open("w", encoding="utf-8") as fh:
+                json.dump(payload, fh, separators=(",", ":"))
+            self.path = tmp.replace(self.path)
+        except OSError:
+            return
+        self.dirty = False
@@ -1,13 +1,28 @@
 from __future__ import annotations
 
+import os
+import re
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from operator import attrgetter
 from pathlib import Path
-from typing import Annotated, Final
+from typing import TYPE_CHECKING, Annotated, Final
 
 import typer
 from rich.console import Console
 from rich.table import Table
 
-from nasa_lsp.analyzer import MAX_FUNCTION_LINES, MIN_ASSERTS_PER_FUNCTION, Diagnostic, analyze
+from nasa_lsp.analyzer import (
+    MAX_FUNCTION_LINES,
+    MIN_ASSERTS_PER_FUNCTION,
+    Diagnostic,
+    DiagnosticArray,
+    analyze_bytes,
+    analyze_path,
+)
+from nasa_lsp.cache import CacheKey, LintCache, default_cache_path, source_digest
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Generator
 
 app = typer.Typer()
 console = Console()
@@ -28,11 +43,82 @@ EXCLUDED_DIRS: Final = frozenset(
     }
 )
 
+# Any excluded name as a whole path component; matched with re.search, whose cache keeps it compiled
+EXCLUDED_PATH_PATTERN: Final = rf"(?:^|/)(?:{'|'.join(map(re.escape, sorted(EXCLUDED_DIRS)))}|[^/]*\.egg-info)(?:/|$)"
+WALK_THREADS: Final = 4
+# Below this many files, starting worker processes costs more than it saves
+PARALLEL_MIN_FILES: Final = 4
+
+
+def _is_excluded_name(name: str) -> bool:
+    assert isinstance(name, str)
+    assert EXCLUDED_DIRS
+    return name in EXCLUDED_DIRS or name.endswith(".egg-info")
+
 
 def should_exclude(path: Path) -> bool:
     assert path
     assert isinstance(path, Path)
-    return any(part in EXCLUDED_DIRS or part.endswith(".egg-info") for part in path.parts)
+    return re.search(EXCLUDED_PATH_PATTERN, path.as_posix()) is not None
+
+
+def _list_dir(path: str) -> list[tuple[str, bool]]:
+    assert path
+    assert EXCLUDED_DIRS
+    # Excluded directories are pruned before descending, and DirEntry reuses the listing's type info
+    try:
+        with os.scandir(path) as it:
+            entries = sorted(it, key=attrgetter("name"), reverse=True)
+    except OSError:
+        # Unreadable or vanished directories are skipped, as the rglob walk did
+        return []
+    listing: list[tuple[str, bool]] = []
+    for entry in entries:
+        if _is_excluded_name(entry.name):
+            continue
+        if entry.is_dir(follow_symlinks=False):
+            listing.append((entry.path, True))
+        elif entry.name.endswith(".py") and entry.is_file():
+            listing.append((entry.path, False))
+    return listing
+
+
+def walk_py(root: Path, list_dir: Callable[[str], list[tuple[str, bool]]] = _list_dir) -> Generator[Path]:
+    assert root
+    assert callable(list_dir)
+    # Listings are reverse-sorted and walked depth-first, so paths come out in the order sorted() gives.
+    # Subdirectories are listed ahead on worker threads, since scandir releases the GIL.
+    pool = ThreadPoolExecutor(max_workers=WALK_THREADS, thread_name_prefix="nasa-walk")
+    try:
+        stack: list[tuple[str, Future[list[tuple[str, bool]]] | None]] = [(str(root), pool.submit(list_dir, str(root)))]
+        while stack:
+            path, listing = stack.pop()
+            if listing is None:
+                yield Path(path)
+                continue
+            children = listing.result()
+            # Submit in the order the stack pops, so the listing needed next is never queued behind its siblings
+            prefetched = {child: pool.submit(list_dir, child) for child, is_dir in reversed(children) if is_dir}
+            stack.extend((child, prefetched.get(child)) for child, _ in children)
+    except BaseException:
+        # A consumer that stops early leaves listings queued; drop them, and let the running ones finish unawaited
+        pool.shutdown(wait=False, cancel_futures=True)
+        raise
+    # A finished walk joins its threads, so the lint pool never forks while they are still exiting
+    pool.shutdown()
+
+
+def _collect_files(paths: list[Path]) -> list[Path]:
+    assert paths
+    assert all(isinstance(p, Path) for p in paths)
+    files: list[Path] = []
+    for p in paths:
+        if p.is_file() and p.suffix == ".py" and not should_exclude(p):
+            files.append(p)
+        elif p.is_dir() and not should_exclude(p):
+            files.extend(walk_py(p))
+    # A single directory already comes out of walk_py in order
+    return files if len(paths) == 1 else sorted(files)
 
 
 def format_diagnostic(path: Path, diag: Diagnostic) -> str:
@@ -43,21 +129,76 @@ def format_diagnostic(path: Path, diag: Diagnostic) -> str:
     return f"{path}:{line}:{col}: {diag.code} {diag.message}"
 
 
-def print_diagnostic(path: Path, diag: Diagnostic, cwd: Path) -> None:
+def diagnostic_markup(path: Path, diag: Diagnostic, cwd: Path) -> str:
     assert path
     assert diag
-    assert console, "Rich console not initialized"
     rel_path = path.relative_to(cwd) if path.is_relative_to(cwd) else path
     line = diag.range.start.line + 1
     col = diag.range.start.character + 1
     location = f"  [cyan]{rel_path}[/cyan]:[yellow]{line}[/yellow]:[dim]{col}[/dim]"
     message = f"[red bold]{diag.code}[/red bold] [white]{diag.message}[/white]"
-    console.print(f"{location} {message}")
+    return f"{location} {message}"
+
+
+def _analyze_one(path: Path) -> DiagnosticArray:
+    assert path
+    assert isinstance(path, Path)
+    diagnostics, _ = analyze_path(path)
+    # Columnar results are far cheaper to pickle back from worker processes
+    return DiagnosticArray.from_diagnostics(diagnostics)
+
+
+def _lint_one(path: Path) -> tuple[str, DiagnosticArray]:
+    assert path
+    assert isinstance(path, Path)
+    # The digest comes from the same read as the analysis, so a cache miss costs one read per file
+    source = path.read_bytes()
+    diagnostics, _ = analyze_bytes(source)
+    return source_digest(source), DiagnosticArray.from_diagnostics(diagnostics)
+
+
+def _analyze_files[T](worker: Callable[[Path], T], files: list[Path], jobs: int | None = None) -> list[T]:
+    assert jobs is None or jobs > 0
+    assert isinstance(files, list)
+    workers = min(len(files), jobs or os.cpu_count() or 1)
+    if workers > 1 and len(files) >= PARALLEL_MIN_FILES:
+        # Files are independent and analysis holds the GIL, so fan out to processes
+        chunksize = max(1, len(files) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(worker, files, chunksize=chunksize))
+    return [worker(file) for file in files]
+
+
+def _lint_files(files: list[Path], cache: LintCache, jobs: int | None = None) -> list[tuple[Path, Diagnostic]]:
+    assert cache
+    assert jobs is None or jobs > 0
+    results: dict[Path, list[Diagnostic]] = {}
+    misses: list[tuple[Path, CacheKey]] = []
+    for file in files:
+        key, diagnostics = cache.get(file)
+        if diagnostics is None:
+            misses.append((file, key))
+        else:
+            results[file] = diagnostics
+
+    fresh = _analyze_files(_lint_one, [file for file, _ in misses], jobs)
+    for (file, key), (digest, batch) in zip(misses, fresh, strict=True):
+        diagnostics = list(batch)
+        cache.put((key[0], key[1], key[2], digest), diagnostics)
+        results[file] = diagnostics
+    return [(file, diag) for file in files for diag in results[file]]
 
 
 @app.command()
 def lint(
     paths: Annotated[list[Path] | None, typer.Argument(help="Files or directories to lint")] = None,
+    *,
+    jobs: Annotated[
+        int | None, typer.Option("--jobs", "-j", min=1, help="Worker processes for analysis (default: one per CPU)")
+    ] = None,
+    use_cache: Annotated[
+        bool, typer.Option("--cache/--no-cache", help="Reuse and store results for unchanged files")
+    ] = True,
 ) -> None:
     """Check Python files for NASA Power of 10 rule violations."""
     assert console is not None
@@ -66,22 +207,26 @@ def lint(
     if paths is None:
         paths = [cwd]
 
-    files: list[Path] = []
-    for p in paths:
-        if p.is_file() and p.suffix == ".py" and not should_exclude(p):
-            files.append(p)
-        elif p.is_dir() and not should_exclude(p):
-            files.extend(f for f in p.rglob("*.py") if not should_exclude(f))
-
-    all_diagnostics: list[tuple[Path, Diagnostic]] = []
-    for file in sorted(files):
-        diagnostics, _ = analyze(file.read_text())
-        all_diagnostics.extend((file, diag) for diag in diagnostics)
+    files = _collect_files(paths)
 
-    for file, diag in all_diagnostics:
-        print_diagnostic(file, diag, cwd)
+    if use_cache:
+        cache = LintCache(default_cache_path(cwd))
+        all_diagnostics = _lint_files(files, cache, jobs)
+        cache.prune(paths)
+        cache.save()
+    else:
+        # Without a cache there is nothing to key, so files are analyzed without hashing them
+        batches = _analyze_files(_analyze_one, files, jobs)
+        all_diagnostics = [(file, diag) for file, batch in zip(files, batches, strict=True) for diag in batch]
 
     if all_diagnostics:
+        # One print keeps the terminal writes O(1) instead of one per diagnostic. The markup already
+        # colors every field, so rich's regex highlighter and line wrapping are pure overhead.
+        console.print(
+            "\n".join(diagnostic_markup(file, diag, cwd) for file, diag in all_diagnostics),
+            highlight=False,
+            soft_wrap=True,
+        )
         total_errors = len(all_diagnostics)
         files_with_errors = len({file for file, _ in all_diagnostics})
         violations = f"{total_errors} violation{'s' if total_errors != 1 else ''}"
@@ -104,12 +249,7 @@ def stats(
     if paths is None:
         paths = [cwd]
 
-    files: list[Path] = []
-    for p in paths:
-        if p.is_file() and p.suffix == ".py" and not should_exclude(p):
-            files.append(p)
-        elif p.is_dir() and not should_exclude(p):
-            files.extend(f for f in p.rglob("*.py") if not should_exclude(f))
+    files = _collect_files(paths)
 
     table = Table(title="NASA Function Audit", header_style="bold magenta")
     table.add_column("Location", style="dim")
@@ -117,8 +257,8 @@ def stats(
     table.add_column("Lines", justify="right")
     table.add_column("Asserts", justify="right")
 
-    for file in sorted(files):
-        _, func_stats = analyze(file.read_text())
+    for file in files:
+        _, func_stats = analyze_path(file)
         for s in func_stats:
             rel_path = file.relative_to(cwd) if file.is_relative_to(cwd) else file
 
@@ -1,6 +1,14 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+import asyncio
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Executor, ThreadPoolExecutor
+from contextlib import suppress
+from functools import lru_cache
+from typing import TYPE_CHECKING, Final
 
 from lsprotocol import types
 from pygls.lsp.server import LanguageServer
@@ -11,8 +19,54 @@ if TYPE_CHECKING:
     from pygls.workspace import TextDocument
 
 server = LanguageServer("nasa-python-lsp", "0.2.0")
+logger = logging.getLogger(__name__)
 
+# Saves, undo/redo and focus changes often resend a buffer the server has already seen
+ANALYSIS_CACHE_SIZE: Final = 32
+_analysis_cache: OrderedDict[bytes, tuple[Diagnostic, ...]] = OrderedDict()
+BUFFER_KEY_SIZE: Final = 16
+DIAGNOSTIC_CACHE_SIZE: Final = 4096
 
+# Clients keep showing the last set published for a URI until a new one replaces it
+_last_published: dict[str, tuple[Diagnostic, ...]] = {}
+
+# Typing sends a change per keystroke; only the buffer left after a pause is worth analyzing.
+# A newer edit cancels the check for its URI whether it is still waiting out the pause or
+# already analyzing on the worker thread, so a stale result is never published.
+DEBOUNCE_SECONDS: Final = 0.15
+pending_checks: dict[str, asyncio.Task[None]] = {}
+analysis_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="nasa-analysis")
+_analysis_cache_lock = threading.Lock()
+
+
+def buffer_key(source: str) -> bytes:
+    assert isinstance(source, str)
+    assert ANALYSIS_CACHE_SIZE > 0
+    return hashlib.blake2b(source.encode(), digest_size=BUFFER_KEY_SIZE).digest()
+
+
+def cached_analyze(source: str, key: bytes | None = None) -> tuple[Diagnostic, ...]:
+    assert isinstance(source, str)
+    assert key is None or len(key) == BUFFER_KEY_SIZE
+    # Callers that already hold the buffer's key pass it in, so the buffer is hashed once per request
+    if key is None:
+        key = buffer_key(source)
+    with _analysis_cache_lock:
+        cached = _analysis_cache.get(key)
+        if cached is not None:
+            _analysis_cache.move_to_end(key)
+            return cached
+    diagnostics, _ = analyze(source)
+    result = tuple(diagnostics)
+    with _analysis_cache_lock:
+        _analysis_cache[key] = result
+        if len(_analysis_cache) > ANALYSIS_CACHE_SIZE:
+            del _analysis_cache[next(iter(_analysis_cache))]
+    return result
+
+
+# Diagnostics are frozen values, and most of them are republished unchanged edit after edit
+@lru_cache(maxsize=DIAGNOSTIC_CACHE_SIZE)
 def to_lsp_diagnostic(diag: Diagnostic) -> types.Diagnostic:
     assert diag
     assert diag.range
@@ -31,7 +85,15 @@ def to_lsp_diagnostic(diag: Diagnostic) -> types.Diagnostic:
 def run_checks(ls: LanguageServer, doc: TextDocument) -> None:
     assert ls
     assert doc
-    diagnostics, _ = analyze(doc.source)
+    publish(ls, doc, cached_analyze(doc.source))
+
+
+def publish(ls: LanguageServer, doc: TextDocument, diagnostics: tuple[Diagnostic, ...]) -> None:
+    assert ls
+    assert doc
+    if _last_published.get(doc.uri) == diagnostics:
+        return
+    _last_published[doc.uri] = diagnostics
     ls.text_document_publish_diagnostics(
         types.PublishDiagnosticsParams(
             uri=doc.uri,
@@ -41,18 +103,90 @@ def run_checks(ls: LanguageServer, doc: TextDocument) -> None:
     )
 
 
+def client_pulls_diagnostics(ls: LanguageServer) -> bool:
+    assert ls
+    assert ls.client_capabilities
+    text_document = ls.client_capabilities.text_document
+    return text_document is not None and text_document.diagnostic is not None
+
+
+@server.feature(
+    types.TEXT_DOCUMENT_DIAGNOSTIC,
+    types.DiagnosticOptions(inter_file_dependencies=False, workspace_diagnostics=False),
+)
+def document_diagnostic(ls: LanguageServer, params: types.DocumentDiagnosticParams) -> types.DocumentDiagnosticReport:
+    assert ls
+    assert ls.workspace
+    doc = ls.workspace.get_text_document(params.text_document.uri)
+    # Results depend only on the buffer, so its digest tells the client whether its copy is current
+    key = buffer_key(doc.source)
+    result_id = key.hex()
+    if params.previous_result_id == result_id:
+        return types.RelatedUnchangedDocumentDiagnosticReport(result_id=result_id)
+    return types.RelatedFullDocumentDiagnosticReport(
+        items=[to_lsp_diagnostic(d) for d in cached_analyze(doc.source, key)], result_id=result_id
+    )
+
+
 @server.feature(types.TEXT_DOCUMENT_DID_OPEN)
 def did_open(ls: LanguageServer, params: types.DidOpenTextDocumentParams) -> None:
     assert ls
     assert ls.workspace
+    # Clients that pull ask for diagnostics of the buffers they show; pushing as well would duplicate them
+    if client_pulls_diagnostics(ls):
+        return
     run_checks(ls, ls.workspace.get_text_document(params.text_document.uri))
 
 
+def _cancel_pending(uri: str) -> None:
+    assert uri
+    assert DEBOUNCE_SECONDS > 0
+    pending = pending_checks.pop(uri, None)
+    if pending is not None:
+        cancelled = pending.cancel()
+        assert cancelled or pending.done()
+
+
+async def _check_after_pause(ls: LanguageServer, uri: str, executor: Executor) -> None:
+    assert ls
+    assert uri
+    check = asyncio.current_task()
+    try:
+        await asyncio.sleep(DEBOUNCE_SECONDS)
+        doc = ls.workspace.get_text_document(uri)
+        diagnostics = await asyncio.get_running_loop().run_in_executor(executor, cached_analyze, doc.source)
+    except Exception:
+        # A buffer the analyzer chokes on, such as one nested past the recursion limit, keeps its last diagnostics
+        logger.exception("Analysis of %s failed", uri)
+        return
+    finally:
+        # A newer edit may already have replaced this check with its own
+        if pending_checks.get(uri) is check:
+            del pending_checks[uri]
+    publish(ls, doc, diagnostics)
+
+
 @server.feature(types.TEXT_DOCUMENT_DID_CHANGE)
-def did_change(ls: LanguageServer, params: types.DidChangeTextDocumentParams) -> None:
+def did_change(
+    ls: LanguageServer, params: types.DidChangeTextDocumentParams, *, executor: Executor = analysis_executor
+) -> None:
     assert ls
     assert ls.workspace
-    run_checks(ls, ls.workspace.get_text_document(params.text_document.uri))
+    uri = params.text_document.uri
+    _cancel_pending(uri)
+    if client_pulls_diagnostics(ls):
+        return
+    pending_checks[uri] = asyncio.ensure_future(_check_after_pause(ls, uri, executor))
+
+
+@server.feature(types.TEXT_DOCUMENT_DID_CLOSE)
+def did_close(ls: LanguageServer, params: types.DidCloseTextDocumentParams) -> None:
+    assert ls
+    uri = params.text_document.uri
+    assert uri
+    _cancel_pending(uri)
+    with suppress(KeyError):
+        del _last_published[uri]
 
 
 def serve() -> None:
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import os
+import random
+import zlib
+from functools import lru_cache
+from typing import TYPE_CHECKING, cast
+
+import pytest
+from hypothesis import settings
+
+from nasa_lsp.analyzer import Diagnostic, FunctionStat, analyze
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from pathlib import Path
+
+# Local runs use Hypothesis's defaults, which already keep the example corpus between sessions;
+# CI runs replay the same derandomized examples every time and have nothing to persist.
+# Nightly runs trade time for a ten times wider search.
+settings.register_profile("ci", derandomize=True, database=None, deadline=None, print_blob=True)
+settings.register_profile("nightly", max_examples=1000, deadline=None, print_blob=True)
+settings.load_profile(os.environ.get("HYPOTHESIS_PROFILE", "ci" if os.environ.get("CI") else "default"))
+
+FUZZ_SEED = 42
+ANALYZE_MEMO_SIZE = 4096
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    assert tmp_path.is_dir()
+    assert monkeypatch
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+
+
+@pytest.fixture(autouse=True)
+def seeded_random(request: pytest.FixtureRequest) -> None:
+    node_id = cast("pytest.Item", request.node).nodeid
+    assert node_id
+    assert FUZZ_SEED
+    # Each test gets its own stream, so results do not depend on test order or on which xdist worker runs it
+    random.seed(FUZZ_SEED ^ zlib.crc32(node_id.encode()))
+
+
+@pytest.fixture(scope="session")
+def memoized_analyze() -> Callable[[str], tuple[list[Diagnostic], list[FunctionStat]]]:
+    # Stress loops regenerate identical sources; analyze() is pure, so the session shares one result per text
+    @lru_cache(maxsize=ANALYZE_MEMO_SIZE)
+    def frozen(code: str) -> tuple[tuple[Diagnostic, ...], tuple[FunctionStat, ...]]:
+        assert isinstance(code, str)
+        assert ANALYZE_MEMO_SIZE
+        diagnostics, stats = analyze(code)
+        return tuple(diagnostics), tuple(stats)
+
+    def memoized(code: str) -> tuple[list[Diagnostic], list[FunctionStat]]:
+        diagnostics, stats = frozen(code)
+        assert isinstance(diagnostics, tuple)
+        assert isinstance(stats, tuple)
+        # Fresh lists per call, so a test that mutates its result cannot corrupt the next one
+        return list(diagnostics), list(stats)
+
+    assert frozen.cache_info().currsize == 0
+    assert callable(memoized)
+    return memoized
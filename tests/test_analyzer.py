@@ -1,10 +1,26 @@
 from __future__ import annotations
 
+import ast
+import pickle
+from dataclasses import FrozenInstanceError
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import pytest
+
 from nasa_lsp.analyzer import (
+    CODE_ASSERT_DENSITY,
+    LEAF_NODE_TYPES,
+    MAX_FUNCTION_LINES,
     Diagnostic,
+    DiagnosticArray,
+    NasaVisitor,
     Position,
     Range,
     analyze,
+    analyze_bytes,
+    analyze_path,
+    may_trigger,
 )
 
 
@@ -276,6 +292,17 @@ def short_func():
     assert len(diagnostics) == 0
 
 
+BOUNDARY_BODY = ["    assert True", "    assert False", *["    pass"] * MAX_FUNCTION_LINES]
+
+
+@pytest.mark.parametrize(("line_count", "codes"), [(MAX_FUNCTION_LINES - 1, []), (MAX_FUNCTION_LINES, ["NASA04"])])
+def test_nasa04_boundary(line_count: int, codes: list[str]) -> None:
+    code = "\n".join(["def edge():", *BOUNDARY_BODY[: line_count - 1]])
+    diagnostics, stats = analyze(code)
+    assert stats[0].line_count == line_count
+    assert [d.code for d in diagnostics] == codes
+
+
 def test_nasa05_detects_zero_asserts() -> None:
     code = """
 def no_asserts():
@@ -425,6 +452,17 @@ def bad():
     assert "NASA05" in codes
 
 
+def test_diagnostics_are_ordered_by_position() -> None:
+    code = """
+def bad():
+    while True:
+        eval("x")
+"""
+    diagnostics, _ = analyze(code)
+    assert [d.code for d in diagnostics] == ["NASA05", "NASA02", "NASA01-A"]
+    assert [d.range.start.line for d in diagnostics] == [1, 2, 3]
+
+
 def test_module_level_code_not_checked_for_asserts() -> None:
     code = """
 x = 1
@@ -468,6 +506,20 @@ def test_range_for_func_name_fallback_when_def_not_found() -> None:
     assert diagnostics[0].range.start.line == 0
 
 
+def test_func_name_range_spans_extra_whitespace() -> None:
+    code = "async   def  foo():\n    pass\n"
+    diagnostics, _ = analyze(code)
+    assert diagnostics[0].range.start.character == code.index("foo")
+    assert diagnostics[0].range.end.character == code.index("foo") + len("foo")
+
+
+def test_func_name_range_falls_back_to_node_column() -> None:
+    visitor = NasaVisitor("pass\n")
+    visitor.run(ast.parse("def foo(): pass"))
+    assert visitor.diagnostics[0].range.start.character == 0
+    assert visitor.diagnostics[0].range.end.character == len("foo")
+
+
 def test_empty_function_body() -> None:
     code = """
 def empty():
@@ -476,3 +528,165 @@ def empty():
     diagnostics, _ = analyze(code)
     assert len(diagnostics) == 1
     assert diagnostics[0].code == "NASA05"
+
+
+def test_nasa05_ignores_asserts_in_functions_nested_in_blocks() -> None:
+    code = """
+def outer():
+    if True:
+        def inner():
+            assert True
+            assert False
+    pass
+"""
+    diagnostics, _ = analyze(code)
+    outer_diags = [d for d in diagnostics if "outer" in d.message]
+    assert len(outer_diags) == 1
+    assert outer_diags[0].code == "NASA05"
+
+
+def test_analyze_path_matches_analyze() -> None:
+    code = "def foo():\n    eval('1')\n"
+    with TemporaryDirectory() as tmpdir:
+        path = Path(tmpdir) / "mod.py"
+        _ = path.write_text(code)
+        assert analyze_path(path) == analyze(code)
+        assert len(analyze_path(path)[0]) == 2
+
+
+def test_analyze_path_honours_coding_cookie_and_bom() -> None:
+    with TemporaryDirectory() as tmpdir:
+        latin = Path(tmpdir) / "latin.py"
+        _ = latin.write_bytes(b"# -*- coding: latin-1 -*-\ns = '\xe9'\ndef foo():\n    pass\n")
+        bom = Path(tmpdir) / "bom.py"
+        _ = bom.write_bytes(b"\xef\xbb\xbfdef foo():\n    pass\n")
+        latin_diags, _ = analyze_path(latin)
+        bom_diags, _ = analyze_path(bom)
+        assert [d.range.start for d in latin_diags] == [Position(line=2, character=4)]
+        assert [d.range.start for d in bom_diags] == [Position(line=0, character=4)]
+
+
+def test_analyze_path_empty_file() -> None:
+    with TemporaryDirectory() as tmpdir:
+        path = Path(tmpdir) / "empty.py"
+        _ = path.write_bytes(b"  \n\n")
+        assert analyze_path(path) == ([], [])
+        assert path.exists()
+
+
+def test_visitor_splits_lines_only_when_needed() -> None:
+    code = "x = 1\nwhile True:\n    pass\n"
+    visitor = NasaVisitor(code)
+    visitor.run(ast.parse(code))
+    assert [d.code for d in visitor.diagnostics] == ["NASA02"]
+    assert "lines" not in vars(visitor)
+
+
+def test_visitor_walks_only_through_run() -> None:
+    # run() owns the whole traversal, so there is no inherited visit() that would skip the scope bookkeeping
+    assert not hasattr(NasaVisitor, "visit")
+    assert not hasattr(NasaVisitor, "generic_visit")
+
+
+def test_leaf_node_types_only_hold_scalars() -> None:
+    assert {ast.Name, ast.Constant, ast.Load, ast.Pass, ast.Import, ast.alias} <= LEAF_NODE_TYPES
+    assert not {ast.Call, ast.Attribute, ast.JoinedStr, ast.Lambda, ast.While, ast.Module} & LEAF_NODE_TYPES
+
+
+def test_may_trigger_prefilters_sources() -> None:
+    assert not may_trigger(b"import os\nx = [1, 2]\nprint(x)\n")
+    assert may_trigger(b"x = 1\nwhile x:\n    x -= 1\n")
+    assert may_trigger(b"getattr(obj, name)\n")
+
+
+def test_analyze_skips_sources_without_triggers() -> None:
+    diagnostics, stats = analyze("class Config:\n    name = 'x'\n")
+    assert diagnostics == []
+    assert stats == []
+    wide, _ = analyze("\uff45val('1')\n")
+    assert [d.code for d in wide] == ["NASA01-A"]
+
+
+def test_may_trigger_keeps_non_ascii_identifiers() -> None:
+    source = "\uff45val('1')\n".encode()
+    assert may_trigger(source)
+    with TemporaryDirectory() as tmpdir:
+        path = Path(tmpdir) / "wide.py"
+        _ = path.write_bytes(source)
+        diagnostics, _ = analyze_path(path)
+        assert [d.code for d in diagnostics] == ["NASA01-A"]
+
+
+def test_analyze_bytes_decodes_coding_cookie_before_prefiltering() -> None:
+    source = b"# coding: utf-7\nx = 1\n+AGU-val('1')\n"
+    assert not may_trigger(source)
+    diagnostics, _ = analyze_bytes(source)
+    assert [d.code for d in diagnostics] == ["NASA01-A"]
+    assert analyze_bytes(b"\xef\xbb\xbfx = 1\n") == ([], [])
+
+
+def test_may_trigger_scans_text_without_encoding() -> None:
+    assert may_trigger("while True:\n    pass\n")
+    assert not may_trigger("import os\n")
+
+
+def test_diagnostics_have_no_instance_dict() -> None:
+    diagnostics, stats = analyze("def foo():\n    pass\n")
+    assert not hasattr(diagnostics[0], "__dict__")
+    assert not hasattr(diagnostics[0].range.start, "__dict__")
+    assert not hasattr(stats[0], "__dict__")
+
+
+def test_diagnostics_are_immutable_and_hashable() -> None:
+    diagnostics, _ = analyze("def foo():\n    pass\n")
+    assert len({diagnostics[0], *analyze("def foo():\n    pass\n")[0]}) == 1
+    with pytest.raises(FrozenInstanceError):
+        diagnostics[0].range.start.line = 3  # pyright: ignore[reportAttributeAccessIssue]
+    assert diagnostics[0].range.start.line == 0
+
+
+def test_rule_codes_are_shared_interned_strings() -> None:
+    diagnostics, _ = analyze("def foo():\n    pass\n")
+    assert diagnostics[0].code is CODE_ASSERT_DENSITY
+    assert diagnostics[0].code == "NASA05"
+
+
+def test_func_name_range_computed_once_per_node() -> None:
+    code = "def foo():\n    foo()\n"
+    visitor = NasaVisitor(code)
+    visitor.run(ast.parse(code))
+    assert [d.code for d in visitor.diagnostics] == ["NASA01-B", "NASA05"]
+    assert visitor.diagnostics[0].range is visitor.diagnostics[1].range
+
+
+def test_repeated_text_gets_independent_results() -> None:
+    code = "def foo():\n    pass\n"
+    first, _ = analyze(code)
+    first.clear()
+    second, _ = analyze(code)
+    assert [d.code for d in second] == ["NASA05"]
+    assert analyze(code) == (second, analyze(code)[1])
+
+
+def test_diagnostic_array_round_trips() -> None:
+    code = "def foo():\n    eval('x')\n    while True:\n        pass\n"
+    diagnostics, _ = analyze(code)
+    batch = DiagnosticArray.from_diagnostics(diagnostics)
+    assert len(batch) == len(diagnostics) == 3
+    assert list(batch) == diagnostics
+    assert all(d.code is c.code for d, c in zip(batch, diagnostics, strict=True))
+
+
+def test_diagnostic_array_pickles_smaller() -> None:
+    diagnostics, _ = analyze("".join(f"def f{i}():\n    pass\n" for i in range(50)))
+    batch = DiagnosticArray.from_diagnostics(diagnostics)
+    assert len(pickle.dumps(batch)) < len(pickle.dumps(diagnostics))
+    assert len(batch) == 50
+
+
+def test_analyze_path_skips_binary_files() -> None:
+    with TemporaryDirectory() as tmpdir:
+        path = Path(tmpdir) / "blob.py"
+        _ = path.write_bytes(b"def foo():\n    pass\n\0\x89PNG")
+        assert analyze_path(path) == ([], [])
+        assert path.stat().st_size > 0
@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from nasa_lsp import analyzer
+from nasa_lsp.analyzer import CODE_ASSERT_DENSITY, Diagnostic, Position, Range
+from nasa_lsp.cache import (
+    ANALYZER_VERSION,
+    CACHE_VERSION,
+    CacheKey,
+    LintCache,
+    content_digest,
+    default_cache_path,
+)
+
+DIAG = Diagnostic(
+    range=Range(start=Position(line=1, character=4), end=Position(line=1, character=7)),
+    message="Function 'foo' has only 0 assert(s); expected at least 2 (NASA05)",
+    code="NASA05",
+)
+
+
+def analyzed_key(cache: LintCache, source: Path) -> CacheKey:
+    # A new file has no digest until the analysis supplies it, as the lint command does
+    key, diagnostics = cache.get(source)
+    assert diagnostics is None
+    assert not key[3]
+    return key[0], key[1], key[2], content_digest(source)
+
+
+def test_cache_miss_on_unknown_file() -> None:
+    with TemporaryDirectory() as tmpdir:
+        source = Path(tmpdir) / "a.py"
+        _ = source.write_text("def foo(): pass")
+        cache = LintCache(Path(tmpdir) / "cache.json")
+        key, diagnostics = cache.get(source)
+        assert diagnostics is None
+        assert key[0] == str(source.absolute())
+        assert not key[3]
+
+
+def test_cache_round_trip_through_disk() -> None:
+    with TemporaryDirectory() as tmpdir:
+        source = Path(tmpdir) / "a.py"
+        _ = source.write_text("def foo(): pass")
+        cache_path = Path(tmpdir) / "nested" / "cache.json"
+        cache = LintCache(cache_path)
+        key = analyzed_key(cache, source)
+        cache.put(key, [DIAG])
+        cache.save()
+
+        _, diagnostics = LintCache(cache_path).get(source)
+        assert diagnostics == [DIAG]
+        assert all(d.code is CODE_ASSERT_DENSITY for d in diagnostics or [])
+
+
+def test_cache_invalidated_when_file_changes() -> None:
+    with TemporaryDirectory() as tmpdir:
+        source = Path(tmpdir) / "a.py"
+        _ = source.write_text("def foo(): pass")
+        cache = LintCache(Path(tmpdir) / "cache.json")
+        key = analyzed_key(cache, source)
+        cache.put(key, [DIAG])
+
+        _ = source.write_text("def foo():\n    assert True\n    assert False\n")
+        _, diagnostics = cache.get(source)
+        assert diagnostics is None
+        assert cache.dirty
+
+
+def test_cache_ignores_corrupt_file() -> None:
+    with TemporaryDirectory() as tmpdir:
+        cache_path = Path(tmpdir) / "cache.json"
+        _ = cache_path.write_text("{not json")
+        cache = LintCache(cache_path)
+        assert cache.entries == {}
+        assert not cache.dirty
+
+
+def test_cache_ignores_other_versions() -> None:
+    with TemporaryDirectory() as tmpdir:
+        cache_path = Path(tmpdir) / "cache.json"
+        _ = cache_path.write_text('{"version": -1, "entries": {"a.py": [0, 0, []]}}')
+        cache = LintCache(cache_path)
+        assert cache.entries == {}
+        assert not cache.dirty
+
+
+def test_cache_hit_when_only_mtime_changes() -> None:
+    with TemporaryDirectory() as tmpdir:
+        source = Path(tmpdir) / "a.py"
+        _ = source.write_text("def foo(): pass")
+        cache = LintCache(Path(tmpdir) / "cache.json")
+        key = analyzed_key(cache, source)
+        cache.put(key, [DIAG])
+        cache.dirty = False
+
+        os.utime(source, ns=(key[1] + 10**9, key[1] + 10**9))
+        new_key, diagnostics = cache.get(source)
+        assert diagnostics == [DIAG]
+        assert new_key[1] != key[1]
+        assert cache.dirty
+
+
+def test_cache_ignores_other_analyzer_versions() -> None:
+    with TemporaryDirectory() as tmpdir:
+        cache_path = Path(tmpdir) / "cache.json"
+        entries: dict[str, list[object]] = {"a.py": [0, 0, "digest", []]}
+        payload: dict[str, object] = {
+            "version": CACHE_VERSION,
+            "analyzer": f"{ANALYZER_VERSION}-old",
+            "entries": entries,
+        }
+        _ = cache_path.write_text(json.dumps(payload))
+        cache = LintCache(cache_path)
+        assert cache.entries == {}
+        assert not cache.dirty
+
+
+def test_analyzer_version_tracks_rule_source() -> None:
+    assert analyzer.__file__
+    source = Path(analyzer.__file__).read_bytes()
+    assert hashlib.sha256(source).hexdigest() == ANALYZER_VERSION
+    assert b"MAX_FUNCTION_LINES" in source
+
+
+def test_cache_prune_drops_unseen_files_under_linted_roots() -> None:
+    with TemporaryDirectory() as tmpdir:
+        root = Path(tmpdir) / "src"
+        root.mkdir()
+        kept, gone = root / "kept.py", root / "gone.py"
+        for source in (kept, gone):
+            _ = source.write_text("def foo(): pass")
+        cache = LintCache(Path(tmpdir) / "cache.json")
+        for source in (kept, gone):
+            cache.put(analyzed_key(cache, source), [DIAG])
+        cache.entries["/elsewhere/other.py"] = [0, 0, "digest", []]
+        cache.save()
+
+        fresh = LintCache(cache.path)
+        _ = fresh.get(kept)
+        fresh.prune([root])
+        assert sorted(fresh.entries) == ["/elsewhere/other.py", str(kept.absolute())]
+        assert fresh.dirty
+
+
+def test_default_cache_path_is_per_project() -> None:
+    first = default_cache_path(Path("/projects/one"))
+    assert first != default_cache_path(Path("/projects/two"))
+    assert first == default_cache_path(Path("/projects/one"))
+    assert first.parent.name == "nasa_lsp"
@@ -1,14 +1,33 @@
 from __future__ import annotations
 
+import hashlib
+import json
+import os
+import runpy
+import sys
+import threading
 from pathlib import Path
 from tempfile import TemporaryDirectory
+from typing import cast
 
+import pytest
 from typer.testing import CliRunner
 
 from nasa_lsp.analyzer import Diagnostic, Position, Range
-from nasa_lsp.cli import EXCLUDED_DIRS, app, format_diagnostic, should_exclude
+from nasa_lsp.cli import (
+    EXCLUDED_DIRS,
+    PARALLEL_MIN_FILES,
+    WALK_THREADS,
+    app,
+    diagnostic_markup,
+    format_diagnostic,
+    should_exclude,
+    walk_py,
+)
 
 runner = CliRunner()
+# Bounds how long a regressed walk can keep listing after close before the test fails
+WALK_JOIN_TIMEOUT = 5
 
 
 def test_format_diagnostic_basic() -> None:
@@ -35,10 +54,24 @@ def test_format_diagnostic_first_line() -> None:
     assert isinstance(result, str)
 
 
-def test_lint_no_args_lints_cwd() -> None:
+def test_diagnostic_markup_uses_relative_path() -> None:
+    diag = Diagnostic(
+        range=Range(start=Position(line=2, character=0), end=Position(line=2, character=3)),
+        message="Unbounded loop",
+        code="NASA02",
+    )
+    result = diagnostic_markup(Path("/repo/src/a.py"), diag, Path("/repo"))
+    assert "[cyan]src/a.py[/cyan]:[yellow]3[/yellow]:[dim]1[/dim]" in result
+    assert result.endswith("[red bold]NASA02[/red bold] [white]Unbounded loop[/white]")
+
+
+def test_lint_no_args_lints_cwd(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    # A small cwd keeps the captured output to the one file instead of the whole repository
+    _ = (tmp_path / "here.py").write_text("def here(): pass")
+    monkeypatch.chdir(tmp_path)
     result = runner.invoke(app, ["lint"])
-    assert result.exit_code in (0, 1)
-    assert result.stdout
+    assert result.exit_code == 1
+    assert "here.py" in result.stdout
 
 
 def test_lint_clean_file() -> None:
@@ -151,6 +184,80 @@ def test_lint_sorted_output() -> None:
         assert a_pos < z_pos, "a.py should appear before z.py in output"
 
 
+def test_lint_parallel_output_matches_file_order() -> None:
+    with TemporaryDirectory() as tmpdir:
+        names = [f"m{i}.py" for i in range(PARALLEL_MIN_FILES + 1)]
+        for name in reversed(names):
+            _ = (Path(tmpdir) / name).write_text(f"def {name[:-3]}(): pass")
+        result = runner.invoke(app, ["lint", str(tmpdir)])
+        assert result.exit_code == 1
+        positions = [result.stdout.find(name) for name in names]
+        assert positions == sorted(positions)
+        assert f"{len(names)} violations" in result.stdout
+
+
+def test_lint_single_job_matches_parallel_output() -> None:
+    with TemporaryDirectory() as tmpdir:
+        for i in range(PARALLEL_MIN_FILES + 1):
+            _ = (Path(tmpdir) / f"m{i}.py").write_text(f"def m{i}(): pass")
+        serial = runner.invoke(app, ["lint", "--jobs", "1", str(tmpdir)])
+        for cached in Path(os.environ["XDG_CACHE_HOME"]).rglob("*.json"):
+            cached.unlink()
+        parallel = runner.invoke(app, ["lint", "-j", "2", str(tmpdir)])
+        assert serial.exit_code == parallel.exit_code == 1
+        assert serial.stdout == parallel.stdout
+
+
+def test_lint_no_cache_neither_reads_nor_writes() -> None:
+    with TemporaryDirectory() as tmpdir:
+        _ = (Path(tmpdir) / "a.py").write_text("def a(): pass")
+        cache_dir = Path(os.environ["XDG_CACHE_HOME"])
+        result = runner.invoke(app, ["lint", "--no-cache", str(tmpdir)])
+        assert result.exit_code == 1
+        assert "NASA05" in result.stdout
+        assert not cache_dir.exists()
+
+
+def test_lint_caches_digest_from_the_analysis_read() -> None:
+    with TemporaryDirectory() as tmpdir:
+        source = Path(tmpdir) / "a.py"
+        _ = source.write_text("def a(): pass")
+        result = runner.invoke(app, ["lint", str(tmpdir)])
+        assert result.exit_code == 1
+        (cache_file,) = Path(os.environ["XDG_CACHE_HOME"]).rglob("*.json")
+        entries = cast("dict[str, list[object]]", json.loads(cache_file.read_text())["entries"])
+        assert entries[str(source.absolute())][2] == hashlib.sha256(source.read_bytes()).hexdigest()
+
+
+def test_lint_drops_cache_entries_of_deleted_files() -> None:
+    with TemporaryDirectory() as tmpdir:
+        kept, gone = Path(tmpdir) / "kept.py", Path(tmpdir) / "gone.py"
+        for source in (kept, gone):
+            _ = source.write_text("def foo(): pass")
+        _ = runner.invoke(app, ["lint", str(tmpdir)])
+        gone.unlink()
+        result = runner.invoke(app, ["lint", str(tmpdir)])
+        assert result.exit_code == 1
+        (cache_file,) = Path(os.environ["XDG_CACHE_HOME"]).rglob("*.json")
+        entries = cast("dict[str, list[object]]", json.loads(cache_file.read_text())["entries"])
+        assert list(entries) == [str(kept.absolute())]
+
+
+def test_lint_rejects_zero_jobs() -> None:
+    result = runner.invoke(app, ["lint", "--jobs", "0"])
+    assert result.exit_code == 2
+    assert "--jobs" in result.output
+
+
+def test_lint_keeps_each_diagnostic_on_one_line() -> None:
+    with TemporaryDirectory() as tmpdir:
+        name = "a_function_name_long_enough_to_overflow_a_narrow_terminal_" * 2
+        _ = (Path(tmpdir) / "long.py").write_text(f"def {name}(): pass")
+        result = runner.invoke(app, ["lint", str(tmpdir)])
+        assert result.exit_code == 1
+        assert any(name in line and line.endswith("(NASA05)") for line in result.stdout.splitlines())
+
+
 def test_lint_syntax_error_file_ignored() -> None:
     with TemporaryDirectory() as tmpdir:
         bad_syntax = Path(tmpdir) / "syntax.py"
@@ -213,6 +320,79 @@ def test_lint_excludes_venv() -> None:
         assert "no violations" in result.stdout or "0 file" in result.stdout
 
 
+def test_walk_py_prunes_excluded_dirs() -> None:
+    with TemporaryDirectory() as tmpdir:
+        root = Path(tmpdir)
+        for rel in ("a.py", "pkg/b.py", "pkg/notes.txt", "pkg.egg-info/c.py", "build/d.py", "x/__pycache__/e.py"):
+            (root / rel).parent.mkdir(parents=True, exist_ok=True)
+            _ = (root / rel).write_text("")
+        found = sorted(path.relative_to(root).as_posix() for path in walk_py(root))
+        assert found == ["a.py", "pkg/b.py"]
+        assert all(path.is_file() for path in walk_py(root))
+
+
+def test_walk_py_yields_sorted_paths() -> None:
+    with TemporaryDirectory() as tmpdir:
+        root = Path(tmpdir)
+        for rel in ("b.py", "a/z.py", "a.py", "a/b/c.py", "a_b.py", "A.py", "a/a.py"):
+            (root / rel).parent.mkdir(parents=True, exist_ok=True)
+            _ = (root / rel).write_text("")
+        found = list(walk_py(root))
+        assert found == sorted(found)
+        assert len(found) == 7
+
+
+@pytest.mark.skipif(sys.platform == "win32" or os.geteuid() == 0, reason="needs POSIX permissions that bind")
+def test_walk_py_skips_unreadable_dirs() -> None:
+    with TemporaryDirectory() as tmpdir:
+        root = Path(tmpdir)
+        for rel in ("a.py", "locked/b.py", "open/c.py"):
+            (root / rel).parent.mkdir(parents=True, exist_ok=True)
+            _ = (root / rel).write_text("")
+        (root / "locked").chmod(0)
+        try:
+            found = [path.relative_to(root).as_posix() for path in walk_py(root)]
+        finally:
+            (root / "locked").chmod(0o755)
+        assert found == ["a.py", "open/c.py"]
+        assert len(found) == 2
+
+
+def test_walk_py_cancels_queued_listings_when_closed() -> None:
+    root = Path("/tree")
+    subdirs = [f"{root}/d{i:02}" for i in range(50)]
+    listed: list[str] = []
+    gate = threading.Event()
+
+    def gated_list_dir(path: str) -> list[tuple[str, bool]]:
+        assert path
+        assert isinstance(listed, list)
+        listed.append(path)
+        if path == str(root):
+            return [(subdir, True) for subdir in reversed(subdirs)]
+        # Every prefetch beyond the first directory holds its walk thread until the walk is closed
+        if path != subdirs[0]:
+            _ = gate.wait()
+        return [(f"{path}/a.py", False)]
+
+    walk = walk_py(root, gated_list_dir)
+    assert next(walk) == root / "d00" / "a.py"
+    walk.close()
+    gate.set()
+    for thread in threading.enumerate():
+        if thread.name.startswith("nasa-walk"):
+            thread.join(timeout=WALK_JOIN_TIMEOUT)
+    # Only the root, the first directory and the listings already running on the walk threads are ever read
+    assert len(listed) <= 2 + WALK_THREADS
+
+
+def test_walk_py_skips_missing_root() -> None:
+    with TemporaryDirectory() as tmpdir:
+        found = list(walk_py(Path(tmpdir) / "gone"))
+        assert found == []
+        assert not (Path(tmpdir) / "gone").exists()
+
+
 def test_lint_empty_file() -> None:
     with TemporaryDirectory() as tmpdir:
         empty_file = Path(tmpdir) / "__init__.py"
@@ -222,10 +402,13 @@ def test_lint_empty_file() -> None:
         assert "no violations" in result.stdout
 
 
-def test_stats_no_args() -> None:
+def test_stats_no_args(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    _ = (tmp_path / "here.py").write_text("def here(): pass")
+    monkeypatch.chdir(tmp_path)
     result = runner.invoke(app, ["stats"])
     assert result.exit_code == 0
     assert "NASA Function Audit" in result.stdout
+    assert "here" in result.stdout
 
 
 def test_stats_single_file() -> None:
@@ -309,3 +492,17 @@ def test_serve_command_imports() -> None:
     result = runner.invoke(app, ["serve", "--help"])
     assert result.exit_code == 0
     assert "Language Server Protocol" in result.stdout
+
+
+@pytest.mark.filterwarnings("ignore:'nasa_lsp.cli' found in sys.modules:RuntimeWarning")
+def test_main_block_runs_in_process(capsys: pytest.CaptureFixture[str]) -> None:
+    # runpy executes the __main__ branch without paying for a child interpreter
+    saved_argv = sys.argv[:]
+    sys.argv[:] = ["nasa", "lint", "--help"]
+    try:
+        with pytest.raises(SystemExit) as exc_info:
+            _ = runpy.run_module("nasa_lsp.cli", run_name="__main__")
+    finally:
+        sys.argv[:] = saved_argv
+    assert exc_info.value.code == 0
+    assert "NASA Power of 10" in capsys.readouterr().out
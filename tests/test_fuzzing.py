@@ -12,6 +12,7 @@ from __future__ import annotations
 import ast
 import random
 import string
+from typing import TYPE_CHECKING, cast
 
 import pytest
 from hypothesis import given, settings
@@ -19,11 +20,24 @@ from hypothesis import strategies as st
 
 from nasa_lsp.analyzer import analyze
 
-# Deterministic seed for reproducible fuzzing
-FUZZ_SEED = 42
+if TYPE_CHECKING:
+    from collections.abc import Callable
 
-# Set random seed at module level for reproducibility
-random.seed(FUZZ_SEED)
+    from nasa_lsp.analyzer import Diagnostic, FunctionStat
+
+    type Analyze = Callable[[str], tuple[list[Diagnostic], list[FunctionStat]]]
+
+# Declared as str rather than a literal, so comments generated at runtime can go between its lines
+COMMENT_FUZZ_BASE: str = """
+def func():
+    assert True
+    assert False
+    return 42
+"""
+
+# Per-test budgets are multiples of the loaded profile's example count. The default and ci profiles
+# keep them at 200/100/50; only a profile that sets max_examples, such as nightly, scales them.
+EXAMPLES = cast("int", settings().max_examples)
 
 # ============================================================================
 # PROPERTY-BASED TESTS WITH HYPOTHESIS
@@ -31,7 +45,7 @@ random.seed(FUZZ_SEED)
 
 
 @given(st.text())
-@settings(max_examples=200)
+@settings(max_examples=2 * EXAMPLES)
 def test_analyze_never_crashes_on_random_strings(code: str) -> None:
     """Property: analyze should never crash on any string input."""
     try:
@@ -48,7 +62,7 @@ def test_analyze_never_crashes_on_random_strings(code: str) -> None:
 
 
 @given(st.text(alphabet=string.printable))
-@settings(max_examples=200)
+@settings(max_examples=2 * EXAMPLES)
 def test_analyze_handles_printable_characters(code: str) -> None:
     """Property: analyze should handle all printable ASCII characters."""
     diagnostics, _ = analyze(code)
@@ -57,7 +71,7 @@ def test_analyze_handles_printable_characters(code: str) -> None:
 
 
 @given(st.integers(min_value=0, max_value=1000))
-@settings(max_examples=100)
+@settings(max_examples=EXAMPLES)
 def test_generated_function_with_n_lines(n: int) -> None:
     """Property: analyze should handle functions of any length."""
     lines = [f"def func_{n}():"]
@@ -79,7 +93,7 @@ def test_generated_function_with_n_lines(n: int) -> None:
 
 
 @given(st.integers(min_value=0, max_value=100))
-@settings(max_examples=50)
+@settings(max_examples=EXAMPLES // 2)
 def test_generated_function_with_n_assertions(n: int) -> None:
     """Property: analyze should handle functions with any number of assertions."""
     lines = [f"def func_with_{n}_asserts():"]
@@ -101,7 +115,7 @@ def test_generated_function_with_n_assertions(n: int) -> None:
 
 
 @given(st.lists(st.text(alphabet=string.ascii_letters, min_size=1, max_size=20), min_size=0, max_size=50))
-@settings(max_examples=100)
+@settings(max_examples=EXAMPLES)
 def test_multiple_function_definitions(func_names: list[str]) -> None:
     """Property: analyze should handle any number of function definitions."""
     lines: list[str] = []
@@ -126,7 +140,7 @@ def test_multiple_function_definitions(func_names: list[str]) -> None:
 
 
 @given(st.booleans())
-@settings(max_examples=50)
+@settings(max_examples=EXAMPLES // 2)
 def test_while_true_detection(has_while_true: bool) -> None:
     """Property: while True should always be detected."""
     if has_while_true:
@@ -170,19 +184,48 @@ def generate_random_identifier(length: int = 10) -> str:
     return result
 
 
+def random_printable(length: int) -> str:
+    """Generate random printable text, each character drawn uniformly from the seeded generator."""
+    assert length >= 0, "Length must not be negative"
+    result = "".join(random.choices(string.printable, k=length))
+    assert len(result) == length, f"Text length {len(result)} != expected {length}"
+    return result
+
+
+# Each builder renders one template, so only the template actually drawn pays for its random values
+EXPRESSION_BUILDERS: list[Callable[[], str]] = [
+    lambda: f"{random.randint(1, 1000)}",
+    lambda: f'"{generate_random_identifier()}"',
+    lambda: f"[{random.randint(1, 10)} for i in range({random.randint(1, 5)})]",
+    generate_random_identifier,
+    lambda: f"{random.randint(1, 100)} + {random.randint(1, 100)}",
+    lambda: "True",
+    lambda: "False",
+    lambda: "None",
+]
+
+STATEMENT_BUILDERS: list[Callable[[], str]] = [
+    lambda: f"{generate_random_identifier()} = {generate_random_expression()}",
+    lambda: f"if {random.choice(['True', 'False'])}:\n        pass",
+    lambda: f"for i in range({random.randint(1, 10)}):\n        pass",
+    lambda: "pass",
+    lambda: "return None",
+    lambda: f"assert {random.choice(['True', 'False'])}",
+]
+
+NUMBER_BUILDERS: list[Callable[[], str]] = [
+    lambda: str(random.randint(-1000000, 1000000)),
+    lambda: str(random.random() * 1000000),
+    lambda: f"{random.random()}+{random.random()}j",
+    lambda: hex(random.randint(0, 0xFFFFFF)),
+    lambda: oct(random.randint(0, 0o7777)),
+    lambda: bin(random.randint(0, 0b11111111)),
+]
+
+
 def generate_random_expression() -> str:
     """Generate a random Python expression."""
-    expressions = [
-        f"{random.randint(1, 1000)}",
-        f'"{generate_random_identifier()}"',
-        f"[{random.randint(1, 10)} for i in range({random.randint(1, 5)})]",
-        f"{generate_random_identifier()}",
-        f"{random.randint(1, 100)} + {random.randint(1, 100)}",
-        "True",
-        "False",
-        "None",
-    ]
-    result = random.choice(expressions)
+    result = random.choice(EXPRESSION_BUILDERS)()
     assert len(result) > 0, "Expression must not be empty"
     assert isinstance(result, str), "Expression must be a string"
     return result
@@ -190,23 +233,17 @@ def generate_random_expression() -> str:
 
 def generate_random_statement() -> str:
     """Generate a random Python statement."""
-    var = generate_random_identifier()
-    expr = generate_random_expression()
-
-    statements = [
-        f"{var} = {expr}",
-        f"if {random.choice(['True', 'False'])}:\n        pass",
-        f"for i in range({random.randint(1, 10)}):\n        pass",
-        "pass",
-        "return None",
-        f"assert {random.choice(['True', 'False'])}",
-    ]
-    result = random.choice(statements)
+    result = random.choice(STATEMENT_BUILDERS)()
     assert len(result) > 0, "Statement must not be empty"
     assert isinstance(result, str), "Statement must be a string"
     return result
 
 
+# Fixed lines are rendered once; only identifiers and statements vary per call
+ASSERT_LINES = [f"    assert {condition}" for condition in ("True", "False", "1 > 0", "0 < 1")]
+FORBIDDEN_CALL_LINES = [f'    {name}("test")' for name in ("eval", "exec", "compile", "globals", "locals")]
+
+
 def generate_random_function(
     num_statements: int = 10,
     num_assertions: int = 2,
@@ -216,33 +253,15 @@ def generate_random_function(
 ) -> str:
     """Generate a random function with specified characteristics."""
     func_name = generate_random_identifier()
-    lines = [f"def {func_name}():"]
-
-    # Add assertions first
-    lines.extend([f"    assert {random.choice(['True', 'False', '1 > 0', '0 < 1'])}" for _ in range(num_assertions)])
-
-    # Add forbidden API if requested
+    lines = [f"def {func_name}():", *random.choices(ASSERT_LINES, k=num_assertions)]
     if include_forbidden_api:
-        forbidden = random.choice(["eval", "exec", "compile", "globals", "locals"])
-        lines.append(f'    {forbidden}("test")')
-
-    # Add while True if requested
+        lines.append(random.choice(FORBIDDEN_CALL_LINES))
     if include_while_true:
-        lines.append("    while True:")
-        lines.append("        break")
-
-    # Add recursion if requested
+        lines.append("    while True:\n        break")
     if include_recursion:
         lines.append(f"    return {func_name}()")
-
-    # Add random statements
-    for _ in range(num_statements):
-        stmt = generate_random_statement()
-        # Indent multi-line statements
-        if "\n" in stmt:
-            lines.append("    " + stmt.replace("\n", "\n    "))
-        else:
-            lines.append(f"    {stmt}")
+    # Indenting after every newline covers single-line and block statements alike
+    lines.extend("    " + generate_random_statement().replace("\n", "\n    ") for _ in range(num_statements))
 
     result = "\n".join(lines)
     assert result.startswith("def "), "Generated code must start with 'def '"
@@ -265,50 +284,47 @@ def func():
 """
     whitespace_chars = [" ", "\t", "\n"]
     for _ in range(30):
-        modified = base_code
+        # Insert into a character list and join once rather than re-slicing the string per insertion
+        chars = list(base_code)
         for _ in range(random.randint(0, 10)):
-            pos = random.randint(0, len(modified) - 1)
-            ws = random.choice(whitespace_chars)
-            modified = modified[:pos] + ws + modified[pos:]
-        diagnostics, _ = analyze(modified)
+            chars.insert(random.randint(0, len(chars) - 1), random.choice(whitespace_chars))
+        diagnostics, _ = analyze("".join(chars))
         assert isinstance(diagnostics, list), "Must return list for whitespace variations"
         assert len(diagnostics) >= 0, "Whitespace variations should be processed"
 
 
 def test_fuzz_comment_variations() -> None:
     """Fuzz test: random comment insertion should be handled gracefully."""
-    base_code = """
-def func():
-    assert True
-    assert False
-    return 42
-"""
+    # Comments never reach the AST, so every variant must report what the base reports
+    base_diagnostics, base_stats = analyze(COMMENT_FUZZ_BASE)
     for _ in range(30):
-        lines = base_code.split("\n")
+        lines = COMMENT_FUZZ_BASE.split("\n")
         num_comments = random.randint(1, 5)
         for _ in range(num_comments):
             pos = random.randint(0, len(lines))
             comment = f"# {generate_random_identifier()}"
-            lines = [*lines[:pos], comment, *lines[pos:]]
+            lines.insert(pos, comment)
         code = "\n".join(lines)
-        diagnostics, _ = analyze(code)
-        assert isinstance(diagnostics, list), "Must return list for comment variations"
-        assert all(hasattr(d, "code") for d in diagnostics), "All diagnostics must be well-formed"
+        diagnostics, stats = analyze(code)
+        assert [d.code for d in diagnostics] == [d.code for d in base_diagnostics], "Comments must not change findings"
+        assert [(f.name, f.assert_count) for f in stats] == [(f.name, f.assert_count) for f in base_stats]
 
 
-def test_fuzz_unicode_identifiers() -> None:
+UNICODE_NAMES = ("функция", "函数", "関数", "função", "función")
+
+
+@pytest.mark.parametrize("name", UNICODE_NAMES)
+def test_fuzz_unicode_identifiers(name: str) -> None:
     """Fuzz test: Unicode identifiers should be handled gracefully."""
-    unicode_names = ["функция", "函数", "関数", "função", "función"]
-    for name in unicode_names:
-        code = f"""
+    code = f"""
 def {name}():
     assert True
     assert False
     return 42
 """
-        diagnostics, _ = analyze(code)
-        assert isinstance(diagnostics, list), f"Must return list for unicode name: {name}"
-        assert len(diagnostics) >= 0, "Unicode identifiers should be processed"
+    diagnostics, _ = analyze(code)
+    assert isinstance(diagnostics, list), f"Must return list for unicode name: {name}"
+    assert len(diagnostics) >= 0, "Unicode identifiers should be processed"
 
 
 def test_fuzz_mixed_quote_styles() -> None:
@@ -333,7 +349,7 @@ def test_fuzz_string_literals() -> None:
     for _ in range(50):
         strings: list[str] = []
         for _ in range(random.randint(1, 10)):
-            s = "".join(random.choices(string.printable, k=random.randint(1, 50)))
+            s = random_printable(random.randint(1, 50))
             s = s.replace('"', '\\"').replace("\\", "\\\\")
             strings.append(f'    s{len(strings)} = "{s}"')
         code = f"""
@@ -353,20 +369,7 @@ def test_fuzz_numeric_literals() -> None:
     for _ in range(50):
         numbers: list[str] = []
         for _ in range(random.randint(1, 20)):
-            num_type = random.choice(["int", "float", "complex", "hex", "oct", "bin"])
-            if num_type == "int":
-                num = str(random.randint(-1000000, 1000000))
-            elif num_type == "float":
-                num = str(random.random() * 1000000)
-            elif num_type == "complex":
-                num = f"{random.random()}+{random.random()}j"
-            elif num_type == "hex":
-                num = hex(random.randint(0, 0xFFFFFF))
-            elif num_type == "oct":
-                num = oct(random.randint(0, 0o7777))
-            else:  # bin
-                num = bin(random.randint(0, 0b11111111))
-            numbers.append(f"    n{len(numbers)} = {num}")
+            numbers.append(f"    n{len(numbers)} = {random.choice(NUMBER_BUILDERS)()}")
         code = f"""
 def func_with_numbers():
     assert True
@@ -384,57 +387,45 @@ def func_with_numbers():
 # ============================================================================
 
 
-@pytest.mark.parametrize(
-    ("structure_type", "test_values"),
-    [
-        ("nesting_depth", [1, 5, 10, 15, 19]),
-        ("function_name_length", [10, 50, 100, 500, 1000]),
-        ("parameter_count", [0, 1, 10, 50, 100]),
-    ],
-)
-def test_fuzz_code_structure(structure_type: str, test_values: list[int]) -> None:
-    """Fuzz test: various code structure extremes should be handled."""
-    if structure_type == "nesting_depth":
-        for depth in test_values:
-            lines = ["def deeply_nested():"]
-            lines.append("    assert True")
-            lines.append("    assert False")
-            indent = "    "
-            for _ in range(depth):
-                lines.append(f"{indent}if True:")
-                indent += "    "
-            lines.append(f"{indent}pass")
-            code = "\n".join(lines)
-            diagnostics, _ = analyze(code)
-            assert isinstance(diagnostics, list), f"Must handle depth {depth}"
-            assert len(diagnostics) >= 0, "Deep nesting should be processed"
-
-    elif structure_type == "function_name_length":
-        for length in test_values:
-            func_name = generate_random_identifier(length)
-            code = f"""
+@pytest.mark.parametrize("depth", [1, 5, 10, 15, 19])
+def test_fuzz_nesting_depth(depth: int) -> None:
+    """Fuzz test: deeply nested blocks should be handled."""
+    lines = ["def deeply_nested():", "    assert True", "    assert False"]
+    lines.extend(f"{'    ' * (level + 1)}if True:" for level in range(depth))
+    lines.append(f"{'    ' * (depth + 1)}pass")
+    diagnostics, _ = analyze("\n".join(lines))
+    assert isinstance(diagnostics, list), f"Must handle depth {depth}"
+    assert len(diagnostics) >= 0, "Deep nesting should be processed"
+
+
+@pytest.mark.parametrize("length", [10, 50, 100, 500, 1000])
+def test_fuzz_function_name_length(length: int) -> None:
+    """Fuzz test: very long function names should be handled."""
+    func_name = generate_random_identifier(length)
+    code = f"""
 def {func_name}():
     assert True
     assert False
     return 42
 """
-            diagnostics, _ = analyze(code)
-            assert isinstance(diagnostics, list), f"Must handle name length {length}"
-            assert len(diagnostics) >= 0, "Long names should be processed"
-
-    elif structure_type == "parameter_count":
-        for num_params in test_values:
-            params = [f"p{i}" for i in range(num_params)]
-            param_list = ", ".join(params)
-            code = f"""
+    diagnostics, _ = analyze(code)
+    assert isinstance(diagnostics, list), f"Must handle name length {length}"
+    assert len(diagnostics) >= 0, "Long names should be processed"
+
+
+@pytest.mark.parametrize("num_params", [0, 1, 10, 50, 100])
+def test_fuzz_parameter_count(num_params: int) -> None:
+    """Fuzz test: functions with many parameters should be handled."""
+    param_list = ", ".join(f"p{i}" for i in range(num_params))
+    code = f"""
 def func({param_list}):
     assert True
     assert False
     return None
 """
-            diagnostics, _ = analyze(code)
-            assert isinstance(diagnostics, list), f"Must handle {num_params} parameters"
-            assert len(diagnostics) >= 0, "Many parameters should be processed"
+    diagnostics, _ = analyze(code)
+    assert isinstance(diagnostics, list), f"Must handle {num_params} parameters"
+    assert len(diagnostics) >= 0, "Many parameters should be processed"
 
 
 # ============================================================================
@@ -528,9 +519,7 @@ def func_{i}():
         assert len(diagnostics) >= 0, "Large files should complete"
 
     elif scale_type == "very_long_function":
-        lines = ["def very_long_function():"]
-        lines.extend([f"    x{i} = {i}" for i in range(scale_value)])
-        code = "\n".join(lines)
+        code = "\n".join(["def very_long_function():", *[f"    x{i} = {i}" for i in range(scale_value)]])
         diagnostics, _ = analyze(code)
         assert isinstance(diagnostics, list), f"Must handle {scale_value}-line function"
         nasa04_violations = [d for d in diagnostics if d.code == "NASA04"]
@@ -567,7 +556,7 @@ def long_line():
     ],
 )
 def test_fuzz_nasa_violation_detection(
-    violation_characteristics: dict[str, int | bool], expected_codes: list[str]
+    violation_characteristics: dict[str, int | bool], expected_codes: list[str], memoized_analyze: Analyze
 ) -> None:
     """Fuzz test: NASA violations should be consistently detected."""
     # Set defaults
@@ -589,7 +578,7 @@ def test_fuzz_nasa_violation_detection(
             include_while_true=bool(config["include_while_true"]),
             include_recursion=bool(config["include_recursion"]),
         )
-        diagnostics, _ = analyze(code)
+        diagnostics, _ = memoized_analyze(code)
         assert isinstance(diagnostics, list), "Must return list for violation detection"
 
         # Check if expected violations are detected (if code is valid)
@@ -607,7 +596,7 @@ def test_fuzz_nasa_violation_detection(
 # ============================================================================
 
 
-def test_fuzz_random_combinations_stress() -> None:
+def test_fuzz_random_combinations_stress(memoized_analyze: Analyze) -> None:
     """Stress test: rapid analysis of diverse random inputs."""
     combinations_tested = 0
     crashes = 0
@@ -634,7 +623,7 @@ def test_fuzz_random_combinations_stress() -> None:
 
         code = "\n\n".join(functions)
         try:
-            diagnostics, _ = analyze(code)
+            diagnostics, _ = memoized_analyze(code)
             assert isinstance(diagnostics, list)
             combinations_tested += 1
         except Exception:
@@ -645,7 +634,7 @@ def test_fuzz_random_combinations_stress() -> None:
     assert crashes == 0, f"Analyzer crashed {crashes} times"
 
 
-def test_fuzz_rapid_stress_test() -> None:
+def test_fuzz_rapid_stress_test(memoized_analyze: Analyze) -> None:
     """Stress test: analyze many varied inputs rapidly."""
     success_count = 0
     total_tests = 500
@@ -654,7 +643,7 @@ def test_fuzz_rapid_stress_test() -> None:
         choice = random.randint(0, 3)
 
         if choice == 0:
-            code = "".join(random.choices(string.printable, k=random.randint(10, 200)))
+            code = random_printable(random.randint(10, 200))
         elif choice == 1:
             code = generate_random_function(
                 num_statements=random.randint(1, 30),
@@ -670,7 +659,7 @@ def valid():
     return 42
 """
 
-        diagnostics, _ = analyze(code)
+        diagnostics, _ = memoized_analyze(code)
         assert isinstance(diagnostics, list)
         success_count += 1
 
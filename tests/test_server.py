@@ -1,11 +1,34 @@
 from __future__ import annotations
 
+import asyncio
+import threading
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING, cast, override
+
+import pytest
 from lsprotocol import types
 from pygls.lsp.server import LanguageServer
 from pygls.workspace import TextDocument
 
 from nasa_lsp.analyzer import Diagnostic, Position, Range
-from nasa_lsp.server import run_checks, server, to_lsp_diagnostic
+from nasa_lsp.server import (
+    ANALYSIS_CACHE_SIZE,
+    DEBOUNCE_SECONDS,
+    analysis_executor,
+    buffer_key,
+    cached_analyze,
+    did_change,
+    did_close,
+    did_open,
+    document_diagnostic,
+    pending_checks,
+    run_checks,
+    server,
+    to_lsp_diagnostic,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
 
 CLEAN_CODE_VERSION = 2
 
@@ -53,6 +76,22 @@ def test_to_lsp_diagnostic_preserves_all_fields() -> None:
     assert isinstance(result.range.end, types.Position)
 
 
+def test_to_lsp_diagnostic_reuses_conversion_for_equal_diagnostics() -> None:
+    def make() -> Diagnostic:
+        diag = Diagnostic(
+            range=Range(start=Position(line=3, character=1), end=Position(line=3, character=9)),
+            message="Repeated",
+            code="NASA05",
+        )
+        assert diag.code == "NASA05"
+        assert diag.range.start.line == 3
+        return diag
+
+    first, second = make(), make()
+    assert first is not second
+    assert to_lsp_diagnostic(first) is to_lsp_diagnostic(second)
+
+
 def test_server_is_language_server() -> None:
     assert server is not None
     assert server.name == "nasa-python-lsp"
@@ -63,31 +102,37 @@ def test_server_version() -> None:
     assert isinstance(server.version, str)
 
 
-def test_run_checks_with_violations() -> None:
+@pytest.fixture
+def published() -> tuple[LanguageServer, list[types.PublishDiagnosticsParams]]:
     ls = LanguageServer("test", "0.1")
-    doc = TextDocument(uri="file:///test.py", source="def foo(): pass", version=1)
-
-    published_diagnostics = None
+    captured: list[types.PublishDiagnosticsParams] = []
 
     def capture_diagnostics(params: types.PublishDiagnosticsParams) -> None:
         assert params is not None
         assert isinstance(params, types.PublishDiagnosticsParams)
-        nonlocal published_diagnostics
-        published_diagnostics = params
+        captured.append(params)
 
     ls.text_document_publish_diagnostics = capture_diagnostics
+    assert ls.name == "test"
+    assert not captured
+    return ls, captured
+
+
+def test_run_checks_with_violations(published: tuple[LanguageServer, list[types.PublishDiagnosticsParams]]) -> None:
+    ls, captured = published
+    doc = TextDocument(uri="file:///test.py", source="def foo(): pass", version=1)
 
     run_checks(ls, doc)
 
-    assert published_diagnostics is not None
-    assert isinstance(published_diagnostics, types.PublishDiagnosticsParams)
-    assert published_diagnostics.uri == "file:///test.py"
-    assert published_diagnostics.version == 1
-    assert len(published_diagnostics.diagnostics) > 0
+    assert len(captured) == 1
+    assert isinstance(captured[0], types.PublishDiagnosticsParams)
+    assert captured[0].uri == "file:///test.py"
+    assert captured[0].version == 1
+    assert len(captured[0].diagnostics) > 0
 
 
-def test_run_checks_with_clean_code() -> None:
-    ls = LanguageServer("test", "0.1")
+def test_run_checks_with_clean_code(published: tuple[LanguageServer, list[types.PublishDiagnosticsParams]]) -> None:
+    ls, captured = published
     clean_source = """
 def foo():
     assert True
@@ -96,39 +141,254 @@ def foo():
 """
     doc = TextDocument(uri="file:///clean.py", source=clean_source, version=CLEAN_CODE_VERSION)
 
-    published_diagnostics = None
+    run_checks(ls, doc)
 
-    def capture_diagnostics(params: types.PublishDiagnosticsParams) -> None:
-        assert params is not None
-        assert isinstance(params, types.PublishDiagnosticsParams)
-        nonlocal published_diagnostics
-        published_diagnostics = params
+    assert len(captured) == 1
+    assert captured[0].uri == "file:///clean.py"
+    assert captured[0].version == CLEAN_CODE_VERSION
+    assert len(captured[0].diagnostics) == 0
 
-    ls.text_document_publish_diagnostics = capture_diagnostics
+
+def test_run_checks_with_syntax_error(published: tuple[LanguageServer, list[types.PublishDiagnosticsParams]]) -> None:
+    ls, captured = published
+    doc = TextDocument(uri="file:///broken.py", source="def broken(", version=1)
 
     run_checks(ls, doc)
 
-    assert published_diagnostics is not None
-    assert published_diagnostics.uri == "file:///clean.py"
-    assert published_diagnostics.version == CLEAN_CODE_VERSION
-    assert len(published_diagnostics.diagnostics) == 0
+    assert len(captured) == 1
+    assert len(captured[0].diagnostics) == 0
 
 
-def test_run_checks_with_syntax_error() -> None:
-    ls = LanguageServer("test", "0.1")
-    doc = TextDocument(uri="file:///broken.py", source="def broken(", version=1)
+def test_run_checks_skips_unchanged_diagnostics(
+    published: tuple[LanguageServer, list[types.PublishDiagnosticsParams]],
+) -> None:
+    ls, captured = published
+    uri = "file:///unchanged.py"
 
-    published_diagnostics = None
+    run_checks(ls, TextDocument(uri=uri, source="def foo(): pass", version=1))
+    run_checks(ls, TextDocument(uri=uri, source="def foo(): pass\n", version=2))
+    run_checks(ls, TextDocument(uri=uri, source="def bar(): pass", version=3))
 
-    def capture_diagnostics(params: types.PublishDiagnosticsParams) -> None:
-        assert params is not None
-        assert isinstance(params, types.PublishDiagnosticsParams)
-        nonlocal published_diagnostics
-        published_diagnostics = params
+    assert [p.version for p in captured] == [1, 3]
+    assert "bar" in captured[1].diagnostics[0].message
 
-    ls.text_document_publish_diagnostics = capture_diagnostics
+
+def test_did_close_republishes_on_reopen(
+    published: tuple[LanguageServer, list[types.PublishDiagnosticsParams]],
+) -> None:
+    ls, captured = published
+    doc = TextDocument(uri="file:///reopened.py", source="def foo(): pass", version=1)
 
+    run_checks(ls, doc)
+    did_close(ls, types.DidCloseTextDocumentParams(text_document=types.TextDocumentIdentifier(uri=doc.uri)))
     run_checks(ls, doc)
 
-    assert published_diagnostics is not None
-    assert len(published_diagnostics.diagnostics) == 0
+    assert len(captured) == 2
+    assert captured[0].diagnostics == captured[1].diagnostics
+
+
+def open_in_workspace(ls: LanguageServer, uri: str, text: str, *, pulls: bool = False) -> None:
+    text_document = types.TextDocumentClientCapabilities(diagnostic=types.DiagnosticClientCapabilities())
+    capabilities = types.ClientCapabilities(text_document=text_document if pulls else None)
+    _ = list(ls.protocol.lsp_initialize(types.InitializeParams(capabilities=capabilities)))
+    ls.workspace.put_text_document(types.TextDocumentItem(uri=uri, language_id="python", version=1, text=text))
+    assert ls.workspace.get_text_document(uri).source == text
+    assert uri in ls.workspace.text_documents
+
+
+async def send_changes(
+    ls: LanguageServer, uri: str, count: int, executor: Executor = analysis_executor
+) -> list[asyncio.Task[None]]:
+    assert count > 0
+    assert DEBOUNCE_SECONDS > 0
+    # The check each change scheduled, so tests can await or inspect it instead of sleeping past the debounce
+    checks: list[asyncio.Task[None]] = []
+    for version in range(2, count + 2):
+        document = types.VersionedTextDocumentIdentifier(uri=uri, version=version)
+        params = types.DidChangeTextDocumentParams(text_document=document, content_changes=[])
+        did_change(ls, params, executor=executor)
+        if uri in pending_checks:
+            checks.append(pending_checks[uri])
+    return checks
+
+
+def test_did_change_debounces_rapid_edits(
+    published: tuple[LanguageServer, list[types.PublishDiagnosticsParams]],
+) -> None:
+    ls, captured = published
+    uri = "file:///typing.py"
+    open_in_workspace(ls, uri, "def foo(): pass")
+
+    async def type_then_pause() -> None:
+        checks = await send_changes(ls, uri, 5)
+        assert not captured
+        _ = await asyncio.wait(checks)
+        assert [check.cancelled() for check in checks] == [True, True, True, True, False]
+        assert len(captured) == 1
+
+    asyncio.run(type_then_pause())
+    assert captured[0].uri == uri
+    assert captured[0].diagnostics
+
+
+class RecordingExecutor(ThreadPoolExecutor):
+    def __init__(self) -> None:
+        super().__init__(max_workers=1)
+        self.submitted: list[Future[object]] = []
+        self.queued: asyncio.Event = asyncio.Event()
+        assert not self.submitted
+        assert not self.queued.is_set()
+
+    @override
+    def submit[T, **P](self, fn: Callable[P, T], /, *args: P.args, **kwargs: P.kwargs) -> Future[T]:
+        future = super().submit(fn, *args, **kwargs)
+        assert isinstance(future, Future)
+        assert callable(fn)
+        self.submitted.append(cast("Future[object]", future))
+        self.queued.set()
+        return future
+
+
+def test_newer_edit_discards_in_flight_analysis(
+    published: tuple[LanguageServer, list[types.PublishDiagnosticsParams]],
+) -> None:
+    ls, captured = published
+    uri = "file:///superseded.py"
+    open_in_workspace(ls, uri, "def stale(): pass")
+    executor = RecordingExecutor()
+    gate = threading.Event()
+
+    async def edit_during_analysis() -> None:
+        # Hold the analysis thread so the first check is still queued when the next edit lands
+        blocker = executor.submit(gate.wait)
+        executor.queued.clear()
+        first = await send_changes(ls, uri, 1, executor)
+        _ = await executor.queued.wait()
+        stale = executor.submitted[-1]
+        ls.workspace.put_text_document(
+            types.TextDocumentItem(uri=uri, language_id="python", version=3, text="def fresh(): pass")
+        )
+        second = await send_changes(ls, uri, 1, executor)
+        _ = await asyncio.wait(first)
+        assert first[0].cancelled()
+        assert stale.cancelled()
+        gate.set()
+        assert blocker.result()
+        _ = await asyncio.wait(second)
+        assert len(captured) == 1
+
+    try:
+        asyncio.run(edit_during_analysis())
+    finally:
+        # Release the analysis thread even when an assertion fails, so a regression fails rather than hangs
+        gate.set()
+        executor.shutdown()
+    assert "fresh" in captured[0].diagnostics[0].message
+    assert "stale" not in captured[0].diagnostics[0].message
+
+
+class FailingExecutor(Executor):
+    @override
+    def submit[T, **P](self, fn: Callable[P, T], /, *args: P.args, **kwargs: P.kwargs) -> Future[T]:
+        assert callable(fn)
+        assert args
+        future: Future[T] = Future()
+        future.set_exception(RecursionError("maximum recursion depth exceeded"))
+        return future
+
+
+def test_failed_analysis_is_logged_and_cleared(
+    published: tuple[LanguageServer, list[types.PublishDiagnosticsParams]], caplog: pytest.LogCaptureFixture
+) -> None:
+    ls, captured = published
+    uri = "file:///nested.py"
+    open_in_workspace(ls, uri, "def foo(): pass")
+
+    async def edit_then_fail() -> None:
+        checks = await send_changes(ls, uri, 1, FailingExecutor())
+        _ = await asyncio.wait(checks)
+        assert checks[0].exception() is None
+        assert uri not in pending_checks
+
+    asyncio.run(edit_then_fail())
+    assert not captured
+    assert f"Analysis of {uri} failed" in caplog.text
+
+
+def test_did_close_cancels_pending_check(
+    published: tuple[LanguageServer, list[types.PublishDiagnosticsParams]],
+) -> None:
+    ls, captured = published
+    uri = "file:///closed.py"
+    open_in_workspace(ls, uri, "def foo(): pass")
+
+    async def type_then_close() -> None:
+        checks = await send_changes(ls, uri, 1)
+        did_close(ls, types.DidCloseTextDocumentParams(text_document=types.TextDocumentIdentifier(uri=uri)))
+        _ = await asyncio.wait(checks)
+        assert checks[0].cancelled()
+        assert uri not in pending_checks
+        assert not captured
+
+    asyncio.run(type_then_close())
+    assert captured == []
+    assert uri in ls.workspace.text_documents
+
+
+def test_document_diagnostic_reports_full_then_unchanged() -> None:
+    ls = LanguageServer("test", "0.1")
+    uri = "file:///pulled.py"
+    open_in_workspace(ls, uri, "def foo(): pass", pulls=True)
+    document = types.TextDocumentIdentifier(uri=uri)
+
+    full = document_diagnostic(ls, types.DocumentDiagnosticParams(text_document=document))
+    assert isinstance(full, types.RelatedFullDocumentDiagnosticReport)
+    assert [d.code for d in full.items] == ["NASA05"]
+
+    again = document_diagnostic(
+        ls, types.DocumentDiagnosticParams(text_document=document, previous_result_id=full.result_id)
+    )
+    assert isinstance(again, types.RelatedUnchangedDocumentDiagnosticReport)
+    assert again.result_id == full.result_id
+
+
+def test_pulling_client_gets_no_pushed_diagnostics(
+    published: tuple[LanguageServer, list[types.PublishDiagnosticsParams]],
+) -> None:
+    ls, captured = published
+    uri = "file:///pull_only.py"
+    open_in_workspace(ls, uri, "def foo(): pass", pulls=True)
+    item = types.TextDocumentItem(uri=uri, language_id="python", version=1, text="def foo(): pass")
+
+    async def open_and_type() -> None:
+        did_open(ls, types.DidOpenTextDocumentParams(text_document=item))
+        assert not captured
+        assert await send_changes(ls, uri, 3) == []
+        assert uri not in pending_checks
+
+    asyncio.run(open_and_type())
+    assert captured == []
+    assert uri in ls.workspace.text_documents
+
+
+def test_cached_analyze_reuses_result_for_same_source() -> None:
+    source = "def cached_twice(): pass"
+    first = cached_analyze(source)
+    assert cached_analyze(source) is first
+    assert [d.code for d in first] == ["NASA05"]
+
+
+def test_cached_analyze_accepts_a_precomputed_key() -> None:
+    source = "def keyed(): pass"
+    first = cached_analyze(source, buffer_key(source))
+    assert cached_analyze(source) is first
+    assert [d.code for d in first] == ["NASA05"]
+
+
+def test_cached_analyze_evicts_oldest_entry() -> None:
+    first = cached_analyze("def evicted(): pass")
+    for i in range(ANALYSIS_CACHE_SIZE):
+        _ = cached_analyze(f"def filler_{i}(): pass")
+    again = cached_analyze("def evicted(): pass")
+    assert again is not first
+    assert again == first